@@ -8,9 +8,17 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
 
 import os
+import time
+
+_started = time.perf_counter()
 
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cftlite.settings')
 
 application = get_asgi_application()
+
+# Warm the worker up front and log startup / time-to-first-response timings.
+from tracker.warmup import prepare
+
+application = prepare(application, started=_started, asgi=True)
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -55,6 +56,10 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'cftlite.urls'
 
+# Route the public page and CSV export to their native async views. Enable
+# when serving through cftlite.asgi (e.g. `uvicorn cftlite.asgi:application`).
+ASYNC_VIEWS = os.environ.get('DJANGO_ASYNC_VIEWS', '0') == '1'
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -73,6 +78,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'cftlite.wsgi.application'
 
+# Run tracker.warmup (templates, URL names, views, forms, DB drivers) when
+# cftlite.wsgi / cftlite.asgi is loaded, before the first request arrives.
+WARMUP_ON_STARTUP = os.environ.get('DJANGO_WARMUP', '1') == '1'
+
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
@@ -98,6 +107,38 @@ if os.environ.get('MYSQL_DATABASE'):
         },
     }
 
+# Keep connections open between requests (seconds; 0 closes them after each
+# request).
+DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DJANGO_CONN_MAX_AGE', '0'))
+DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+# Optional clinic shards, e.g. DJANGO_CLINIC_SHARDS='shard1,shard2'.
+# Each alias becomes an extra database (SQLite `<alias>.sqlite3`, or MySQL
+# `<MYSQL_DATABASE>_<alias>`) holding the follow-ups and view logs of the
+# clinics placed on it. New clinics go to the least-populated shard.
+CLINIC_SHARDS = [
+    alias.strip()
+    for alias in os.environ.get('DJANGO_CLINIC_SHARDS', '').split(',')
+    if alias.strip()
+]
+
+# `manage.py test` also gets a `shard_b` database (created only for the run),
+# so the sharding tests go through a real second database.
+_SHARD_DATABASES = list(CLINIC_SHARDS)
+if sys.argv[1:2] == ['test'] and 'shard_b' not in _SHARD_DATABASES:
+    _SHARD_DATABASES.append('shard_b')
+
+for _alias in _SHARD_DATABASES:
+    if _alias == 'default':
+        continue
+    DATABASES[_alias] = dict(DATABASES['default'])
+    if DATABASES['default']['ENGINE'] == 'django.db.backends.mysql':
+        DATABASES[_alias]['NAME'] = f"{DATABASES['default']['NAME']}_{_alias}"
+    else:
+        DATABASES[_alias]['NAME'] = BASE_DIR / f'{_alias}.sqlite3'
+
+DATABASE_ROUTERS = ['tracker.sharding.ClinicShardRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -135,6 +176,30 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Follow-up reminders (`python manage.py send_reminders`).
+REMINDER_BACKEND = os.environ.get('DJANGO_REMINDER_BACKEND', 'tracker.reminders.ConsoleReminderBackend')
+REMINDER_FILE_PATH = os.environ.get('DJANGO_REMINDER_FILE_PATH', str(BASE_DIR / 'reminders.jsonl'))
+# Absolute origin used for public links sent outside a request (reminders).
+PUBLIC_BASE_URL = os.environ.get('DJANGO_PUBLIC_BASE_URL', 'http://127.0.0.1:8000')
+
+# Compressed JSONL segments written by `python manage.py archive_followups`.
+ARCHIVE_DIR = os.environ.get('DJANGO_ARCHIVE_DIR', str(BASE_DIR / 'archive'))
+
+# Startup and warm-up timings (tracker.warmup) are logged at INFO.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'tracker': {
+            'handlers': ['console'],
+            'level': os.environ.get('DJANGO_TRACKER_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
+
 LOGIN_URL = '/accounts/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/accounts/login/'
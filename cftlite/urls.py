@@ -14,6 +14,7 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import include, path
 
@@ -22,6 +23,10 @@ from tracker import views as tracker_views
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('accounts/', include('django.contrib.auth.urls')),
-    path('p/<str:public_token>/', tracker_views.public_followup, name='public_followup'),
+    path(
+        'p/<str:public_token>/',
+        tracker_views.apublic_followup if settings.ASYNC_VIEWS else tracker_views.public_followup,
+        name='public_followup',
+    ),
     path('', include('tracker.urls')),
 ]
@@ -1,24 +1,246 @@
+from datetime import date, datetime
+
 from django.contrib import admin
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Max, Min, Q
+from django.http import QueryDict
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from . import analytics, search
+from .models import (
+	ArchivedFollowUp,
+	Clinic,
+	FollowUp,
+	FollowUpDirectory,
+	FollowUpTombstone,
+	PublicViewLog,
+	UserProfile,
+)
+from .sharding import SHARDED_MODELS, placement_shards
+
+
+class EstimatedCountPaginator(Paginator):
+	"""Paginator that never runs an exact ``COUNT(*)`` over a large table.
+
+	Unfiltered changelists on MySQL use the table statistics; everything else
+	counts at most ``max_count`` matching rows, which caps the page links.
+	"""
+
+	max_count = 10_000
+
+	@cached_property
+	def count(self) -> int:
+		qs = self.object_list
+		if not qs.query.has_filters():
+			estimate = self._estimated_rows(qs)
+			if estimate is not None and estimate > self.max_count:
+				return estimate
+		return qs.order_by()[: self.max_count].count()
+
+	@staticmethod
+	def _estimated_rows(qs) -> int | None:
+		connection = connections[qs.db]
+		if connection.vendor == 'mysql':
+			with connection.cursor() as cursor:
+				cursor.execute(
+					'SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s',
+					[qs.model._meta.db_table],
+				)
+				row = cursor.fetchone()
+			return int(row[0]) if row and row[0] is not None else None
+		# No SQLite shortcut: the highest id overstates follow-ups (ids come from
+		# the global directory) and view logs (archiving deletes old ones).
+		return None
+
+
+def indexed_date_filter(field_name: str, label: str):
+	"""Year/month list filter backed by range lookups on an indexed date field.
+
+	Replaces ``date_hierarchy``, whose year/month links come from a DISTINCT
+	scan of the whole table; here the year choices need only MIN and MAX.
+	"""
+
+	class IndexedDateFilter(admin.SimpleListFilter):
+		title = label
+		parameter_name = f'{field_name}_period'
+
+		def __init__(self, request, params, model, model_admin):
+			self.field = model._meta.get_field(field_name)
+			super().__init__(request, params, model, model_admin)
+
+		def lookups(self, request, model_admin):
+			bounds = model_admin.get_queryset(request).aggregate(first=Min(field_name), last=Max(field_name))
+			if bounds['first'] is None:
+				return []
+			first_year, last_year = (self._local_date(bounds[key]).year for key in ('first', 'last'))
+			choices = [(str(year), str(year)) for year in range(last_year, first_year - 1, -1)]
+
+			selected = self.value() or ''
+			if selected[:4].isdigit():
+				year = selected[:4]
+				month_choices = [(f'{year}-{month:02d}', f'{year}-{month:02d}') for month in range(12, 0, -1)]
+				index = choices.index((year, year)) + 1 if (year, year) in choices else len(choices)
+				choices[index:index] = month_choices
+			return choices
+
+		def queryset(self, request, queryset):
+			bounds = self._period_bounds(self.value())
+			if bounds is None:
+				return queryset
+			start, end = bounds
+			return queryset.filter(**{f'{field_name}__gte': start, f'{field_name}__lt': end})
+
+		@staticmethod
+		def _local_date(value) -> date:
+			if isinstance(value, datetime):
+				return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+			return value
+
+		def _period_bounds(self, value):
+			try:
+				if not value:
+					return None
+				if len(value) == 4:
+					start, end = date(int(value), 1, 1), date(int(value) + 1, 1, 1)
+				else:
+					year, month = (int(part) for part in value.split('-'))
+					start = date(year, month, 1)
+					end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+			except ValueError:
+				return None
+			if self.field.get_internal_type() == 'DateTimeField':
+				start, end = (timezone.make_aware(datetime.combine(d, datetime.min.time())) for d in (start, end))
+			return start, end
+
+	return IndexedDateFilter
+
+
+class ScalableAdminMixin:
+	"""Changelist settings for tables too large for exact counts and scans."""
+
+	paginator = EstimatedCountPaginator
+	show_full_result_count = False
+
+
+def admin_shards() -> list[str]:
+	"""Databases holding sharded rows: ``default`` (pre-shard data) plus each clinic shard."""
+	return list(dict.fromkeys([DEFAULT_DB_ALIAS, *placement_shards()]))
 
-from .models import Clinic, FollowUp, PublicViewLog, UserProfile
+
+def _requested_shard(request) -> str:
+	# Change and delete pages carry the changelist's filters in _changelist_filters.
+	value = request.GET.get('shard') or QueryDict(request.GET.get('_changelist_filters', '')).get('shard')
+	return value if value in admin_shards() else DEFAULT_DB_ALIAS
+
+
+class ShardFilter(admin.SimpleListFilter):
+	"""Picks the database a sharded changelist reads; there is no cross-shard "All"."""
+
+	title = 'shard'
+	parameter_name = 'shard'
+
+	def __init__(self, request, params, model, model_admin):
+		self.current = _requested_shard(request)
+		super().__init__(request, params, model, model_admin)
+
+	def lookups(self, request, model_admin):
+		shards = admin_shards()
+		return [(alias, alias) for alias in shards] if len(shards) > 1 else []
+
+	def queryset(self, request, queryset):
+		# The shard is applied by ShardedAdminMixin.get_queryset.
+		return queryset
+
+	def choices(self, changelist):
+		for lookup, label in self.lookup_choices:
+			yield {
+				'selected': lookup == self.current,
+				'query_string': changelist.get_query_string({self.parameter_name: lookup}),
+				'display': label,
+			}
+
+
+class ShardedAdminMixin:
+	"""Admin for a sharded model: reads and edits one shard at a time.
+
+	The changelist shows the shard picked in its "shard" filter (``default``
+	unless chosen); change pages find their row on that same shard, or via
+	``object_shard`` when the model can tell.
+	"""
+
+	def get_queryset(self, request):
+		queryset = super().get_queryset(request).using(_requested_shard(request))
+		unjoinable = self._unjoinable_relations(request)
+		return queryset.prefetch_related(*unjoinable) if unjoinable else queryset
+
+	def get_list_select_related(self, request):
+		related = super().get_list_select_related(request)
+		unjoinable = self._unjoinable_relations(request)
+		return tuple(name for name in related if name not in unjoinable) if unjoinable else related
+
+	def get_list_filter(self, request):
+		return (ShardFilter, *super().get_list_filter(request))
+
+	def _unjoinable_relations(self, request) -> list[str]:
+		# Clinics and users exist only on `default`; on another shard they are
+		# fetched from there in one extra query instead of joined.
+		if _requested_shard(request) == DEFAULT_DB_ALIAS or not isinstance(self.list_select_related, (list, tuple)):
+			return []
+		return [
+			name
+			for name in self.list_select_related
+			if self.model._meta.get_field(name).related_model._meta.label_lower not in SHARDED_MODELS
+		]
+
+	def get_search_results(self, request, queryset, search_term):
+		term = search_term.strip()
+		if not term:
+			return queryset, False
+		# Clinics are few and live on `default`; match them there, then use the
+		# follow-up (clinic, ...) indexes.
+		clinic_ids = list(
+			Clinic.objects.filter(Q(clinic_code=term) | Q(name__icontains=term)).values_list('pk', flat=True)
+		)
+		matches = (
+			search.search_followups(queryset, None, term)
+			| queryset.filter(public_token=term)
+			| queryset.filter(clinic_id__in=clinic_ids)
+		)
+		return matches, False
+
+	def object_shard(self, object_id) -> str | None:
+		return None
+
+	def get_object(self, request, object_id, from_field=None):
+		alias = self.object_shard(object_id) or _requested_shard(request)
+		queryset = super().get_queryset(request).using(alias)
+		field = self.model._meta.pk if from_field is None else self.model._meta.get_field(from_field)
+		try:
+			return queryset.get(**{field.name: field.to_python(object_id)})
+		except (self.model.DoesNotExist, ValidationError, ValueError):
+			return None
 
 
 @admin.register(Clinic)
 class ClinicAdmin(admin.ModelAdmin):
-	list_display = ('name', 'clinic_code', 'created_at')
+	list_display = ('name', 'clinic_code', 'shard', 'created_at')
 	search_fields = ('name', 'clinic_code')
-	readonly_fields = ('clinic_code', 'created_at')
+	readonly_fields = ('clinic_code', 'shard', 'created_at')
 
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
 	list_display = ('user', 'clinic')
+	list_select_related = ('user', 'clinic')
 	search_fields = ('user__username', 'clinic__name', 'clinic__clinic_code')
-	list_filter = ('clinic',)
+	autocomplete_fields = ('user', 'clinic')
 
 
 @admin.register(FollowUp)
-class FollowUpAdmin(admin.ModelAdmin):
+class FollowUpAdmin(ShardedAdminMixin, ScalableAdminMixin, admin.ModelAdmin):
 	list_display = (
 		'patient_name',
 		'phone',
@@ -29,14 +251,53 @@ class FollowUpAdmin(admin.ModelAdmin):
 		'public_token',
 		'created_at',
 	)
-	search_fields = ('patient_name', 'phone', 'public_token', 'clinic__name', 'clinic__clinic_code')
-	list_filter = ('status', 'language', 'clinic', 'due_date')
-	readonly_fields = ('public_token', 'created_at', 'updated_at')
+	list_select_related = ('clinic',)
+	# Searched by get_search_results, which keeps every lookup on an index.
+	# Narrow to one clinic with ?clinic__id__exact=<id>.
+	search_fields = ('=public_token',)
+	search_help_text = 'Patient name (word prefixes), phone prefix, exact public token, or clinic name or code.'
+	list_filter = ('status', 'language', indexed_date_filter('due_date', 'due date'))
+	autocomplete_fields = ('clinic',)
+	raw_id_fields = ('created_by',)
+	readonly_fields = ('public_token', 'version', 'created_at', 'updated_at')
+	ordering = ('-id',)
+
+	def object_shard(self, object_id) -> str | None:
+		# Follow-up ids are global, so the directory knows the shard.
+		if not str(object_id).isdigit():
+			return None
+		return FollowUpDirectory.objects.filter(pk=object_id).values_list('clinic__shard', flat=True).first()
+
+	def delete_queryset(self, request, queryset):
+		# The bulk delete action skips FollowUp.delete(), so unindex the names,
+		# leave the change-feed tombstones and take the rows out of analytics here.
+		rows = list(queryset.values_list('pk', 'clinic_id', 'created_at', 'due_date', 'completed_at'))
+		removal = analytics.removal_deltas(queryset.db, rows)
+		super().delete_queryset(request, queryset)
+		search.unindex_names(queryset.db, [row[0] for row in rows])
+		FollowUpTombstone.record([row[:2] for row in rows], FollowUpTombstone.Reason.DELETED)
+		analytics.apply_deltas(removal)
 
 
 @admin.register(PublicViewLog)
-class PublicViewLogAdmin(admin.ModelAdmin):
+class PublicViewLogAdmin(ShardedAdminMixin, ScalableAdminMixin, admin.ModelAdmin):
 	list_display = ('followup', 'viewed_at', 'ip_address')
-	list_filter = ('viewed_at',)
-	search_fields = ('followup__public_token', 'followup__patient_name', 'ip_address')
+	list_select_related = ('followup',)
+	list_filter = (indexed_date_filter('viewed_at', 'viewed at'),)
+	search_fields = ('=followup__public_token',)
+	search_help_text = 'Exact public token of the follow-up.'
 	readonly_fields = ('followup', 'viewed_at', 'user_agent', 'ip_address')
+	ordering = ('-id',)
+
+
+@admin.register(ArchivedFollowUp)
+class ArchivedFollowUpAdmin(ScalableAdminMixin, admin.ModelAdmin):
+	list_display = ('id', 'public_token', 'clinic', 'segment', 'line_no', 'archived_at')
+	list_select_related = ('clinic',)
+	search_fields = ('=id', '=public_token')
+	search_help_text = 'Exact follow-up id or public token.'
+	readonly_fields = ('id', 'public_token', 'clinic', 'segment', 'line_no', 'archived_at')
+	ordering = ('-id',)
+
+	def has_add_permission(self, request):
+		return False
@@ -0,0 +1,252 @@
+"""Per-clinic daily aggregates behind the analytics page.
+
+``ClinicDailyStats`` rows are bumped as follow-ups are created, completed,
+reopened and rescheduled. Public views are folded in by ``catch_up_views``
+(the ``catchup_analytics`` command) from a ``viewed_at`` high-water mark, so
+the public page stays a single INSERT. ``recompute`` rebuilds the same numbers
+from scratch for ``rebuild_analytics``.
+"""
+
+from __future__ import annotations
+
+import json
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+COUNTERS = ('created', 'due', 'due_completed', 'completed', 'completion_seconds', 'views')
+
+VIEWS_WATERMARK = 'views'
+# Views newer than this are left for the next run, so rows whose INSERT
+# commits late are never skipped by the advancing high-water mark.
+VIEWS_SETTLE_DELAY = timedelta(minutes=1)
+
+
+def local_day(value: datetime) -> date:
+	return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+
+
+def completion_seconds(created_at: datetime, completed_at: datetime) -> int:
+	return max(0, int((completed_at - created_at).total_seconds()))
+
+
+def bump(clinic_id: int, day: date, **deltas: int) -> None:
+	"""Add ``deltas`` to the clinic's counters for ``day``, creating the row if needed."""
+	from .models import ClinicDailyStats
+
+	deltas = {name: value for name, value in deltas.items() if value}
+	if not deltas:
+		return
+	qs = ClinicDailyStats.objects.using(DEFAULT_DB_ALIAS).filter(clinic_id=clinic_id, day=day)
+	if qs.update(**{name: F(name) + value for name, value in deltas.items()}):
+		return
+	try:
+		with transaction.atomic(using=DEFAULT_DB_ALIAS):
+			ClinicDailyStats.objects.using(DEFAULT_DB_ALIAS).create(clinic_id=clinic_id, day=day, **deltas)
+	except IntegrityError:
+		qs.update(**{name: F(name) + value for name, value in deltas.items()})
+
+
+def _add_transition(deltas: dict, created_at: datetime, old: dict | None, new: dict) -> None:
+	"""Accumulate per-day counter changes for one follow-up going from ``old`` to ``new``.
+
+	``old`` and ``new`` hold ``due_date`` and ``completed_at``; ``old`` is None
+	for a newly created follow-up.
+	"""
+	if old is None:
+		deltas[local_day(created_at)]['created'] += 1
+		deltas[new['due_date']]['due'] += 1
+	elif old['due_date'] != new['due_date']:
+		deltas[old['due_date']]['due'] -= 1
+		deltas[new['due_date']]['due'] += 1
+
+	# Done follow-ups by due date, whenever they were completed.
+	if old is not None and old['completed_at'] is not None:
+		deltas[old['due_date']]['due_completed'] -= 1
+	if new['completed_at'] is not None:
+		deltas[new['due_date']]['due_completed'] += 1
+
+	old_completed_at = old['completed_at'] if old else None
+	if old_completed_at == new['completed_at']:
+		return
+	if old_completed_at is not None:
+		day = deltas[local_day(old_completed_at)]
+		day['completed'] -= 1
+		day['completion_seconds'] -= completion_seconds(created_at, old_completed_at)
+	if new['completed_at'] is not None:
+		day = deltas[local_day(new['completed_at'])]
+		day['completed'] += 1
+		day['completion_seconds'] += completion_seconds(created_at, new['completed_at'])
+
+
+def _apply(clinic_id: int, deltas: dict) -> None:
+	for day, counters in deltas.items():
+		bump(clinic_id, day, **counters)
+
+
+def record_followup_change(followup, old: dict | None) -> None:
+	"""Apply a saved follow-up's transition from ``old`` (None when created)."""
+	deltas: dict = defaultdict(Counter)
+	new = {'due_date': followup.due_date, 'completed_at': followup.completed_at}
+	_add_transition(deltas, followup.created_at, old, new)
+	_apply(followup.clinic_id, deltas)
+
+
+def record_created(followups) -> None:
+	"""Apply follow-ups inserted without save() (``bulk_create``) to their clinics' daily rows."""
+	by_clinic: dict[int, dict] = defaultdict(lambda: defaultdict(Counter))
+	for followup in followups:
+		new = {'due_date': followup.due_date, 'completed_at': followup.completed_at}
+		_add_transition(by_clinic[followup.clinic_id], followup.created_at, None, new)
+	apply_deltas(by_clinic)
+
+
+def record_bulk_change(clinic_id: int, rows, values: dict) -> None:
+	"""Apply a queryset UPDATE of ``values`` to ``(created_at, due_date, completed_at)`` rows read just before it."""
+	deltas: dict = defaultdict(Counter)
+	for created_at, due_date, completed_at in rows:
+		old = {'due_date': due_date, 'completed_at': completed_at}
+		_add_transition(deltas, created_at, old, {**old, **{k: v for k, v in values.items() if k in old}})
+	_apply(clinic_id, deltas)
+
+
+def removal_deltas(using: str, rows) -> dict[int, dict]:
+	"""Counter changes, per clinic and day, that take deleted follow-ups out of the daily rows.
+
+	``rows`` are ``(id, clinic_id, created_at, due_date, completed_at)``. Call
+	before the delete: the view logs already counted go with the follow-ups.
+	"""
+	from .models import AnalyticsWatermark, PublicViewLog
+
+	by_clinic: dict[int, dict] = defaultdict(lambda: defaultdict(Counter))
+	clinic_of = {}
+	for pk, clinic_id, created_at, due_date, completed_at in rows:
+		clinic_of[pk] = clinic_id
+		deltas = by_clinic[clinic_id]
+		deltas[local_day(created_at)]['created'] -= 1
+		deltas[due_date]['due'] -= 1
+		if completed_at is not None:
+			deltas[due_date]['due_completed'] -= 1
+			deltas[local_day(completed_at)]['completed'] -= 1
+			deltas[local_day(completed_at)]['completion_seconds'] -= completion_seconds(created_at, completed_at)
+
+	views_until = AnalyticsWatermark.objects.filter(name=VIEWS_WATERMARK).values_list('position', flat=True).first()
+	if views_until is not None and clinic_of:
+		views = (
+			PublicViewLog.objects.using(using)
+			.filter(followup_id__in=list(clinic_of), viewed_at__lt=views_until)
+			.annotate(day=TruncDate('viewed_at'))
+			.values('followup_id', 'day')
+			.annotate(n=Count('id'))
+		)
+		for row in views:
+			by_clinic[clinic_of[row['followup_id']]][row['day']]['views'] -= row['n']
+	return by_clinic
+
+
+def apply_deltas(by_clinic: dict[int, dict]) -> None:
+	for clinic_id, deltas in by_clinic.items():
+		_apply(clinic_id, deltas)
+
+
+def catch_up_views(*, now: datetime | None = None) -> int:
+	"""Count public views since the high-water mark into the daily rows; return how many."""
+	from .models import AnalyticsWatermark, Clinic, PublicViewLog
+
+	until = (now or timezone.now()) - VIEWS_SETTLE_DELAY
+	shards = sorted(set(Clinic.objects.values_list('shard', flat=True)))
+	watermark, _ = AnalyticsWatermark.objects.get_or_create(name=VIEWS_WATERMARK)
+
+	since = watermark.position
+	if since is None:
+		firsts = [
+			PublicViewLog.objects.using(alias).order_by('viewed_at').values_list('viewed_at', flat=True).first()
+			for alias in shards
+		]
+		firsts = [value for value in firsts if value is not None]
+		if not firsts:
+			return 0
+		since = min(firsts)
+
+	counted = 0
+	# One day per step keeps each GROUP BY and transaction bounded.
+	while since < until:
+		window_end = min(since + timedelta(days=1), until)
+		with transaction.atomic(using=DEFAULT_DB_ALIAS):
+			for alias in shards:
+				rows = (
+					PublicViewLog.objects.using(alias)
+					.filter(viewed_at__gte=since, viewed_at__lt=window_end)
+					.annotate(day=TruncDate('viewed_at'))
+					.values('followup__clinic_id', 'day')
+					.annotate(n=Count('id'))
+				)
+				for row in rows:
+					bump(row['followup__clinic_id'], row['day'], views=row['n'])
+					counted += row['n']
+			AnalyticsWatermark.objects.filter(pk=watermark.pk).update(position=window_end)
+		since = window_end
+	return counted
+
+
+def recompute() -> dict[tuple[int, date], dict[str, int]]:
+	"""Full recompute of every daily row from follow-ups, view logs and archive segments.
+
+	Views are counted up to the current high-water mark, matching what
+	``catch_up_views`` has applied.
+	"""
+	from . import archive
+	from .models import AnalyticsWatermark, ArchivedFollowUp, Clinic, FollowUp, PublicViewLog
+
+	totals: dict[tuple[int, date], dict[str, int]] = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+	views_until = AnalyticsWatermark.objects.filter(name=VIEWS_WATERMARK).values_list('position', flat=True).first()
+
+	def add_followup(clinic_id, created_at, due_date, completed_at):
+		totals[(clinic_id, local_day(created_at))]['created'] += 1
+		totals[(clinic_id, due_date)]['due'] += 1
+		if completed_at is not None:
+			totals[(clinic_id, due_date)]['due_completed'] += 1
+			bucket = totals[(clinic_id, local_day(completed_at))]
+			bucket['completed'] += 1
+			bucket['completion_seconds'] += completion_seconds(created_at, completed_at)
+
+	for alias in sorted(set(Clinic.objects.values_list('shard', flat=True))):
+		rows = FollowUp.objects.using(alias).values_list('clinic_id', 'created_at', 'due_date', 'completed_at')
+		for row in rows.iterator(chunk_size=2000):
+			add_followup(*row)
+		if views_until is not None:
+			views = (
+				PublicViewLog.objects.using(alias)
+				.filter(viewed_at__lt=views_until)
+				.annotate(day=TruncDate('viewed_at'))
+				.values('followup__clinic_id', 'day')
+				.annotate(n=Count('id'))
+			)
+			for row in views:
+				totals[(row['followup__clinic_id'], row['day'])]['views'] += row['n']
+
+	# Only lines still referenced by the index: a batch retried after a failure
+	# leaves an orphaned earlier segment with the same follow-ups.
+	archived_lines: dict[str, set[int]] = defaultdict(set)
+	for segment, line_no in ArchivedFollowUp.objects.values_list('segment', 'line_no').iterator(chunk_size=2000):
+		archived_lines[segment].add(line_no)
+	for segment, line_numbers in archived_lines.items():
+		with archive.open_segment(segment) as f:
+			for line_no, line in enumerate(f):
+				if line_no not in line_numbers:
+					continue
+				record = json.loads(line)
+				followup = archive.dict_to_row(FollowUp, record['followup'])
+				add_followup(followup.clinic_id, followup.created_at, followup.due_date, followup.completed_at)
+				if views_until is None:
+					continue
+				for data in record['view_logs']:
+					log = archive.dict_to_row(PublicViewLog, data)
+					if log.viewed_at < views_until:
+						totals[(followup.clinic_id, local_day(log.viewed_at))]['views'] += 1
+
+	return {key: counters for key, counters in totals.items() if any(counters.values())}
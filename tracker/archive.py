@@ -0,0 +1,85 @@
+"""Cold storage for completed follow-ups.
+
+`archive_followups` moves old ``done`` follow-ups, with their view logs and
+reminders, into gzip-compressed JSONL segment files under ``ARCHIVE_DIR``.
+``ArchivedFollowUp`` rows (on ``default``) index every record by id and public
+token, pointing at its segment and line.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+
+
+def _row_to_dict(obj: models.Model) -> dict:
+	return {field.attname: getattr(obj, field.attname) for field in obj._meta.concrete_fields}
+
+
+def dict_to_row(model_cls: type[models.Model], data: dict) -> models.Model:
+	return model_cls(
+		**{field.attname: field.to_python(data.get(field.attname)) for field in model_cls._meta.concrete_fields}
+	)
+
+
+def archive_root() -> Path:
+	return Path(settings.ARCHIVE_DIR)
+
+
+def write_segment(shard: str, records: list[dict]) -> str:
+	"""Write records as one gzip JSONL segment and return its path relative to ARCHIVE_DIR.
+
+	Each record is ``{'followup': obj, 'view_logs': [...], 'reminders': [...]}``
+	of model instances. The file is fsynced and renamed into place, so a segment
+	either exists completely or not at all.
+	"""
+	relative = Path(shard) / f"segment-{timezone.now().strftime('%Y%m%d-%H%M%S-%f')}.jsonl.gz"
+	path = archive_root() / relative
+	path.parent.mkdir(parents=True, exist_ok=True)
+	tmp_path = path.with_suffix('.tmp')
+
+	with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+		for record in records:
+			line = {
+				'followup': _row_to_dict(record['followup']),
+				'view_logs': [_row_to_dict(log) for log in record['view_logs']],
+				'reminders': [_row_to_dict(reminder) for reminder in record['reminders']],
+			}
+			f.write(json.dumps(line, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n')
+	with open(tmp_path, 'rb') as f:
+		os.fsync(f.fileno())
+	os.replace(tmp_path, path)
+	return relative.as_posix()
+
+
+def open_segment(segment: str):
+	return gzip.open(archive_root() / segment, 'rt', encoding='utf-8')
+
+
+def read_record(segment: str, line_no: int) -> dict | None:
+	with open_segment(segment) as f:
+		for i, line in enumerate(f):
+			if i == line_no:
+				return json.loads(line)
+	return None
+
+
+def load_archived_followup(*, pk: int | None = None, public_token: str | None = None):
+	"""Rebuild an archived follow-up (unsaved instance) from its segment, or return None."""
+	from .models import ArchivedFollowUp, FollowUp
+
+	lookup = {'pk': pk} if pk is not None else {'public_token': public_token}
+	entry = ArchivedFollowUp.objects.filter(**lookup).first()
+	if entry is None:
+		return None
+	record = read_record(entry.segment, entry.line_no)
+	if record is None:
+		return None
+	return dict_to_row(FollowUp, record['followup'])
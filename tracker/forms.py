@@ -10,6 +10,9 @@ _PHONE_RE = re.compile(r"^\+?[0-9]{7,15}$")
 
 
 class FollowUpForm(forms.ModelForm):
+    # The version the user started editing; saving on top of a newer one is a conflict.
+    version = forms.IntegerField(widget=forms.HiddenInput, required=False, min_value=1)
+
     class Meta:
         model = FollowUp
         fields = ['patient_name', 'phone', 'language', 'notes', 'due_date', 'status']
@@ -18,6 +21,17 @@ class FollowUpForm(forms.ModelForm):
             'notes': forms.Textarea(attrs={'rows': 3}),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.fields['version'].initial = self.instance.version
+
+    def save(self, commit=True):
+        version = self.cleaned_data.get('version')
+        if self.instance.pk and version:
+            self.instance.version = version
+        return super().save(commit)
+
     def clean_phone(self) -> str:
         phone = (self.cleaned_data.get('phone') or '').strip()
         if not _PHONE_RE.match(phone):
@@ -0,0 +1,149 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from tracker import archive, search
+from tracker.models import ArchivedFollowUp, Clinic, FollowUp, FollowUpReminder, FollowUpTombstone, PublicViewLog
+
+
+@dataclass
+class ArchiveStats:
+    followups: int = 0
+    view_logs: int = 0
+    segments: int = 0
+    skipped: int = 0
+
+
+class Command(BaseCommand):
+    help = (
+        'Move follow-ups completed before --before, with their view logs and reminders, '
+        'into compressed JSONL segments under ARCHIVE_DIR. Public links keep working through ArchivedFollowUp.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', required=True, help='Cutoff date (YYYY-MM-DD); follow-ups completed earlier are archived')
+        parser.add_argument('--batch-size', type=int, default=500, help='Follow-ups per segment and transaction')
+
+    def handle(self, *args, **options):
+        try:
+            cutoff_date = date.fromisoformat(options['before'])
+        except ValueError:
+            raise SystemExit('--before must be YYYY-MM-DD')
+        cutoff = timezone.make_aware(datetime.combine(cutoff_date, datetime.min.time()))
+        batch_size = max(1, options['batch_size'])
+
+        stats = ArchiveStats()
+        for alias in sorted(set(Clinic.objects.values_list('shard', flat=True))):
+            self._archive_shard(alias, cutoff, batch_size, stats)
+
+        self.stdout.write(f'Archived follow-ups done before {cutoff_date.isoformat()}')
+        self.stdout.write(f'Follow-ups: {stats.followups}')
+        self.stdout.write(f'View logs: {stats.view_logs}')
+        self.stdout.write(f'Segments: {stats.segments}')
+        self.stdout.write(f'Skipped (changed while archiving): {stats.skipped}')
+
+    def _archive_shard(self, alias: str, cutoff, batch_size: int, stats: ArchiveStats) -> None:
+        eligible = (
+            FollowUp.objects.using(alias)
+            .filter(status=FollowUp.Status.DONE, completed_at__lt=cutoff)
+            .order_by('pk')
+        )
+        last_pk = 0
+        while True:
+            followups = list(eligible.filter(pk__gt=last_pk)[:batch_size])
+            if not followups:
+                break
+            last_pk = followups[-1].pk
+            pks = [f.pk for f in followups]
+
+            logs_by_followup: dict[int, list] = {pk: [] for pk in pks}
+            for log in PublicViewLog.objects.using(alias).filter(followup_id__in=pks).order_by('pk'):
+                logs_by_followup[log.followup_id].append(log)
+            reminders_by_followup: dict[int, list] = {pk: [] for pk in pks}
+            for reminder in FollowUpReminder.objects.using(alias).filter(followup_id__in=pks).order_by('pk'):
+                reminders_by_followup[reminder.followup_id].append(reminder)
+
+            # The segment is durable before anything is deleted; if a later step
+            # fails, the rows are still hot and the next run archives them again.
+            segment = archive.write_segment(
+                alias,
+                [
+                    {'followup': f, 'view_logs': logs_by_followup[f.pk], 'reminders': reminders_by_followup[f.pk]}
+                    for f in followups
+                ],
+            )
+
+            # Only follow-ups whose rows still match what the segment holds are
+            # moved: unchanged since the read (same version, still done before the
+            # cutoff) and with no view logs or reminders added since. The rest stay
+            # hot and go into a later segment; their lines here are never indexed.
+            with transaction.atomic(using=alias):
+                current = dict(eligible.filter(pk__in=pks).select_for_update().values_list('pk', 'version'))
+                unchanged = [f for f in followups if current.get(f.pk) == f.version]
+                unchanged_pks = [f.pk for f in unchanged]
+                log_pks = [log.pk for f in unchanged for log in logs_by_followup[f.pk]]
+                reminder_pks = [r.pk for f in unchanged for r in reminders_by_followup[f.pk]]
+                grown = set(
+                    PublicViewLog.objects.using(alias)
+                    .filter(followup_id__in=unchanged_pks)
+                    .exclude(pk__in=log_pks)
+                    .values_list('followup_id', flat=True)
+                ) | set(
+                    FollowUpReminder.objects.using(alias)
+                    .filter(followup_id__in=unchanged_pks)
+                    .exclude(pk__in=reminder_pks)
+                    .values_list('followup_id', flat=True)
+                )
+                moved = [f for f in unchanged if f.pk not in grown]
+                moved_pks = [f.pk for f in moved]
+                moved_set = set(moved_pks)
+
+                PublicViewLog.objects.using(alias).filter(
+                    pk__in=[log.pk for f in moved for log in logs_by_followup[f.pk]]
+                ).delete()
+                FollowUpReminder.objects.using(alias).filter(
+                    pk__in=[r.pk for f in moved for r in reminders_by_followup[f.pk]]
+                ).delete()
+                pks_by_version: dict[int, list] = defaultdict(list)
+                for f in moved:
+                    pks_by_version[f.version].append(f.pk)
+                same_version = Q(pk__in=[])  # matches nothing when no follow-up moves
+                for version, version_pks in pks_by_version.items():
+                    same_version |= Q(version=version, pk__in=version_pks)
+                _, deleted = eligible.filter(same_version).delete()
+
+                if deleted.get(FollowUp._meta.label, 0) != len(moved):
+                    # Without row locks (SQLite) a row can still change before the
+                    # delete; undo the batch and leave it to the next run.
+                    transaction.set_rollback(True, using=alias)
+                    moved = []
+                else:
+                    # The index commits before the shard delete, so a failure in
+                    # between leaves indexed rows that are still hot, never lost ones.
+                    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+                        ArchivedFollowUp.objects.filter(pk__in=moved_pks).delete()
+                        ArchivedFollowUp.objects.bulk_create(
+                            [
+                                ArchivedFollowUp(
+                                    id=f.pk,
+                                    public_token=f.public_token,
+                                    clinic_id=f.clinic_id,
+                                    segment=segment,
+                                    line_no=line_no,
+                                )
+                                for line_no, f in enumerate(followups)
+                                if f.pk in moved_set
+                            ]
+                        )
+                        FollowUpTombstone.record([(f.pk, f.clinic_id) for f in moved], FollowUpTombstone.Reason.ARCHIVED)
+                    search.unindex_names(alias, moved_pks)
+
+            stats.followups += len(moved)
+            stats.view_logs += sum(len(logs_by_followup[f.pk]) for f in moved)
+            stats.skipped += len(followups) - len(moved)
+            stats.segments += 1
@@ -0,0 +1,109 @@
+import asyncio
+import time
+import types
+from collections import Counter
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.urls import path
+
+from tracker import views
+from tracker.models import Clinic, FollowUp
+
+
+def _urlconf_for(view) -> types.ModuleType:
+    urlconf = types.ModuleType('bench_public_page_urls')
+    urlconf.urlpatterns = [path('p/<str:public_token>/', view, name='public_followup')]
+    return urlconf
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare concurrent /p/<token>/ throughput under ASGI for the sync and async public views. '
+        'Every request writes a PublicViewLog row.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--token', help='Public token to request (defaults to the first follow-up)')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per run')
+        parser.add_argument('--concurrency', type=int, default=50, help='In-flight requests')
+
+    def handle(self, *args, **options):
+        token = options['token'] or self._live_token()
+        if not token:
+            raise SystemExit('No follow-ups found. Create one or pass --token.')
+
+        total = max(1, options['requests'])
+        concurrency = max(1, options['concurrency'])
+
+        self.stdout.write(f'{total} requests, concurrency {concurrency}, token {token}')
+        for label, view in (('sync', views.public_followup), ('async', views.apublic_followup)):
+            with override_settings(ROOT_URLCONF=_urlconf_for(view), ALLOWED_HOSTS=['*']):
+                statuses, elapsed, drain = asyncio.run(self._run(ASGIHandler(), token, total, concurrency))
+            ok = statuses.count(200)
+            if ok != total:
+                counts = ', '.join(f'{status}: {n}' for status, n in sorted(Counter(statuses).items()))
+                raise SystemExit(f'{label}: {total - ok}/{total} requests did not return 200 ({counts}); no throughput reported')
+            self.stdout.write(
+                f'{label:>5}: {total / elapsed:8.1f} req/s  ({elapsed:.2f}s, {ok}/{total} OK'
+                + (f', view logs flushed {drain:.2f}s later)' if drain else ')')
+            )
+
+    @staticmethod
+    def _live_token() -> str | None:
+        # Directory rows outlive deleted and archived follow-ups, so pick from the shards.
+        for alias in sorted(set(Clinic.objects.values_list('shard', flat=True))):
+            token = FollowUp.objects.using(alias).order_by('pk').values_list('public_token', flat=True).first()
+            if token:
+                return token
+        return None
+
+    async def _run(self, application, token: str, total: int, concurrency: int):
+        semaphore = asyncio.Semaphore(concurrency)
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': f'/p/{token}/',
+            'raw_path': f'/p/{token}/'.encode(),
+            'query_string': b'',
+            'root_path': '',
+            'headers': [(b'host', b'localhost'), (b'user-agent', b'bench_public_page')],
+            'client': ('127.0.0.1', 50000),
+            'server': ('localhost', 80),
+        }
+
+        async def one_request() -> int:
+            sent = False
+            status = 0
+
+            async def receive():
+                nonlocal sent
+                if not sent:
+                    sent = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                # Keep the connection open; the handler cancels this wait when done.
+                await asyncio.Event().wait()
+
+            async def send(message):
+                nonlocal status
+                if message['type'] == 'http.response.start':
+                    status = message['status']
+
+            async with semaphore:
+                await application(dict(scope), receive, send)
+            return status
+
+        started = time.perf_counter()
+        statuses = await asyncio.gather(*(one_request() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+
+        drain_started = time.perf_counter()
+        pending = list(views._background_tasks)
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        drain = time.perf_counter() - drain_started if pending else 0.0
+        return list(statuses), elapsed, drain
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from tracker import analytics
+
+
+class Command(BaseCommand):
+    help = (
+        'Fold public page views recorded since the last run into the per-clinic daily analytics. '
+        'Run it periodically (e.g. every few minutes from cron); reruns only count new views.'
+    )
+
+    def handle(self, *args, **options):
+        counted = analytics.catch_up_views()
+        self.stdout.write(f'Views counted: {counted}')
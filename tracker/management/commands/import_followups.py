@@ -36,6 +36,7 @@ class Command(BaseCommand):
 
         try:
             clinic_id = user.userprofile.clinic_id
+            db_alias = user.userprofile.clinic.shard
         except Exception:
             raise SystemExit('UserProfile not found for this user. Create it and link a Clinic first.')
 
@@ -69,7 +70,7 @@ class Command(BaseCommand):
                     if status not in {FollowUp.Status.PENDING, FollowUp.Status.DONE}:
                         raise ValueError('Invalid status (use pending/done).')
 
-                    FollowUp.objects.create(
+                    FollowUp.objects.using(db_alias).create(
                         clinic_id=clinic_id,
                         created_by=user,
                         patient_name=patient_name,
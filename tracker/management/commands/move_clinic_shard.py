@@ -0,0 +1,216 @@
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from tracker import search
+from tracker.models import Clinic, FollowUp, FollowUpReminder, PublicViewLog
+
+# Passes over the rows still on the source after the mapping flips, and
+# attempts per batch when rows keep changing under it.
+CATCH_UP_PASSES = 3
+BATCH_ATTEMPTS = 3
+
+
+@dataclass
+class MoveStats:
+    followups: int = 0
+    view_logs: int = 0
+    reminders: int = 0
+    recopied: int = 0
+
+
+class Command(BaseCommand):
+    help = (
+        "Move a clinic's follow-ups, view logs and reminders to another database shard. "
+        'Rows written to the source while it runs (edits, new follow-ups, public visits) are carried over; '
+        'a follow-up also edited on the target after the switch is left on the source and reported.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clinic', required=True, help='clinic_code of the clinic to move')
+        parser.add_argument('--to', required=True, dest='target', help='Target database alias')
+        parser.add_argument('--batch-size', type=int, default=500, help='Follow-ups copied per transaction')
+
+    def handle(self, *args, **options):
+        target = options['target']
+        batch_size = max(1, options['batch_size'])
+
+        if target not in settings.DATABASES:
+            raise SystemExit(f'Unknown database alias: {target}')
+
+        clinic = Clinic.objects.filter(clinic_code=options['clinic']).first()
+        if not clinic:
+            raise SystemExit(f"Clinic not found: {options['clinic']}")
+
+        source = clinic.shard
+        if source == target:
+            raise SystemExit(f'Clinic is already on {target}')
+
+        stats = MoveStats()
+        source_qs = FollowUp.objects.using(source).filter(clinic_id=clinic.pk).order_by('pk')
+        # What the target holds: follow-up versions, and the source pks of the
+        # view logs and reminders copied there. Only these are deleted later.
+        written: dict[int, int] = {}
+        copied_logs: set[int] = set()
+        copied_reminders: set[int] = set()
+
+        # Copy in keyset batches. Follow-up ids come from the global directory,
+        # so they are kept as-is; view log and reminder ids are per-shard and reassigned.
+        last_pk = 0
+        while True:
+            followups = list(source_qs.filter(pk__gt=last_pk)[:batch_size])
+            if not followups:
+                break
+            logs = list(PublicViewLog.objects.using(source).filter(followup__in=followups).order_by('pk'))
+            reminders = list(FollowUpReminder.objects.using(source).filter(followup__in=followups).order_by('pk'))
+
+            with transaction.atomic(using=target):
+                for followup in followups:
+                    followup.save_base(raw=True, force_insert=True, using=target)
+                copied_logs.update(self._insert_copies(logs, target))
+                copied_reminders.update(self._insert_copies(reminders, target))
+                search.index_names(target, [(f.pk, f.clinic_id, f.patient_name) for f in followups])
+
+            written.update((f.pk, f.version) for f in followups)
+            stats.followups += len(followups)
+            stats.view_logs += len(logs)
+            stats.reminders += len(reminders)
+            last_pk = followups[-1].pk
+
+        # Flip the mapping: from here on every lookup resolves to the target.
+        Clinic.objects.filter(pk=clinic.pk).update(shard=target)
+
+        # Requests that resolved the shard before the flip may still write to the
+        # source, so each pass re-copies what changed there before deleting it.
+        kept: set[int] = set()
+        for _ in range(CATCH_UP_PASSES):
+            last_pk = 0
+            while True:
+                for attempt in range(BATCH_ATTEMPTS):
+                    result = self._move_batch(
+                        source_qs, source, target, last_pk, batch_size, written, copied_logs, copied_reminders, stats
+                    )
+                    if result is not None:
+                        break
+                else:
+                    raise SystemExit(
+                        f'Rows of clinic {clinic.clinic_code} kept changing on {source} after id {last_pk}; '
+                        'they are still there. The clinic now reads from the target: rerun once writes settle.'
+                    )
+                batch_last_pk, batch_kept = result
+                if batch_last_pk is None:
+                    break
+                kept.update(batch_kept)
+                last_pk = batch_last_pk
+            if not source_qs.exclude(pk__in=kept).exists():
+                break
+
+        self.stdout.write(f'Moved clinic {clinic.clinic_code} from {source} to {target}')
+        self.stdout.write(f'Follow-ups: {stats.followups}')
+        self.stdout.write(f'View logs: {stats.view_logs}')
+        self.stdout.write(f'Reminders: {stats.reminders}')
+        self.stdout.write(f'Re-copied (changed during the move): {stats.recopied}')
+        left = sorted(source_qs.values_list('pk', flat=True))
+        if left:
+            raise SystemExit(
+                f'{len(left)} follow-up(s) left on {source} (edited on both shards, or still being written): '
+                f"{', '.join(map(str, left))}"
+            )
+
+    def _move_batch(self, source_qs, source, target, last_pk, batch_size, written, copied_logs, copied_reminders, stats):
+        """Re-copy one batch's source changes to the target, then delete exactly the copied rows.
+
+        Returns ``(last id, ids left on the source)``, ``(None, ())`` when no rows
+        are left, or None when rows changed under the batch and it was rolled back.
+        """
+        # The target commits first: if the source delete then fails, rows exist on
+        # both shards for the next run to reconcile, never on neither.
+        with transaction.atomic(using=source), transaction.atomic(using=target):
+            followups = list(source_qs.filter(pk__gt=last_pk).select_for_update()[:batch_size])
+            if not followups:
+                return None, ()
+            pks = [f.pk for f in followups]
+            on_target = dict(FollowUp.objects.using(target).filter(pk__in=pks).values_list('pk', 'version'))
+            fields = [field for field in FollowUp._meta.concrete_fields if not field.primary_key]
+
+            moving, kept, recopied = [], [], 0
+            for followup in followups:
+                if followup.pk not in written:
+                    # Created on the source during the move.
+                    if followup.pk in on_target:
+                        kept.append(followup.pk)
+                        continue
+                    followup.save_base(raw=True, force_insert=True, using=target)
+                    recopied += 1
+                elif followup.version != written[followup.pk]:
+                    # Edited on the source after it was copied: overwrite the copy
+                    # only if nobody has edited it on the target since the switch.
+                    updated = (
+                        FollowUp.objects.using(target)
+                        .filter(pk=followup.pk, version=written[followup.pk])
+                        .update(**{field.attname: getattr(followup, field.attname) for field in fields})
+                    )
+                    if not updated:
+                        kept.append(followup.pk)
+                        continue
+                    recopied += 1
+                moving.append(followup)
+            moving_pks = [f.pk for f in moving]
+
+            logs = list(PublicViewLog.objects.using(source).filter(followup_id__in=moving_pks).order_by('pk'))
+            reminders = list(FollowUpReminder.objects.using(source).filter(followup_id__in=moving_pks).order_by('pk'))
+            log_pks = [log.pk for log in logs]
+            reminder_pks = [reminder.pk for reminder in reminders]
+            new_logs = [log for log in logs if log.pk not in copied_logs]
+            # A reminder for the same due date may already have been sent from the target.
+            sent = set(
+                FollowUpReminder.objects.using(target)
+                .filter(followup_id__in=moving_pks)
+                .values_list('followup_id', 'due_date')
+            )
+            new_reminders = [
+                r for r in reminders if r.pk not in copied_reminders and (r.followup_id, r.due_date) not in sent
+            ]
+            new_log_pks = self._insert_copies(new_logs, target)
+            new_reminder_pks = self._insert_copies(new_reminders, target)
+            search.index_names(target, [(f.pk, f.clinic_id, f.patient_name) for f in moving])
+
+            PublicViewLog.objects.using(source).filter(pk__in=log_pks).delete()
+            FollowUpReminder.objects.using(source).filter(pk__in=reminder_pks).delete()
+            same_version = Q(pk__in=[])  # matches nothing when no follow-up moves
+            for followup in moving:
+                same_version |= Q(pk=followup.pk, version=followup.version)
+            # Checked before the follow-up delete, which would cascade to them.
+            grown = (
+                PublicViewLog.objects.using(source).filter(followup_id__in=moving_pks).exists()
+                or FollowUpReminder.objects.using(source).filter(followup_id__in=moving_pks).exists()
+            )
+            deleted = {} if grown else FollowUp.objects.using(source).filter(same_version).delete()[1]
+            if grown or deleted.get(FollowUp._meta.label, 0) != len(moving):
+                # Without row locks (SQLite) a row can still change under the batch;
+                # undo it on both shards and try it again.
+                transaction.set_rollback(True, using=target)
+                transaction.set_rollback(True, using=source)
+                return None
+            search.unindex_names(source, moving_pks)
+
+        written.update((f.pk, f.version) for f in moving)
+        copied_logs.update(new_log_pks)
+        copied_reminders.update(new_reminder_pks)
+        stats.view_logs += len(new_logs)
+        stats.reminders += len(new_reminders)
+        stats.recopied += recopied
+        return followups[-1].pk, kept
+
+    @staticmethod
+    def _insert_copies(rows, target) -> list[int]:
+        """Insert view log or reminder ``rows`` on ``target`` under new ids; return their source ids."""
+        source_pks = []
+        for row in rows:
+            source_pks.append(row.pk)
+            row.pk = None
+            row.save_base(raw=True, force_insert=True, using=target)
+        return source_pks
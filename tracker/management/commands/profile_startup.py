@@ -0,0 +1,87 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Runs in a fresh interpreter: import the WSGI app as a server would, then time
+# two requests to PATH straight through the WSGI callable.
+_PROBE = """
+import json, sys, time
+from wsgiref.util import setup_testing_defaults
+
+started = time.perf_counter()
+import cftlite.wsgi
+imported = time.perf_counter() - started
+from tracker.warmup import STARTUP
+
+
+def request(path):
+    environ = {'PATH_INFO': path}
+    setup_testing_defaults(environ)
+    statuses = []
+    begin = time.perf_counter()
+    response = cftlite.wsgi.application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    b''.join(response)
+    getattr(response, 'close', lambda: None)()
+    return time.perf_counter() - begin, statuses[0]
+
+
+first, status = request(sys.argv[1])
+second, _ = request(sys.argv[1])
+print(json.dumps({
+    'setup': STARTUP['setup'],
+    'warmup': STARTUP.get('warmup', 0.0),
+    'import': imported,
+    'first': first,
+    'second': second,
+    'status': status,
+}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure worker startup in fresh processes: import time of cftlite.wsgi and time to the first '
+        'response, with the warm-up on and off. Requests go straight to the WSGI callable.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/accounts/login/', help='Path to request')
+        parser.add_argument('--runs', type=int, default=3, help='Fresh processes per mode (medians are reported)')
+
+    def handle(self, *args, **options):
+        runs = max(1, options['runs'])
+        self.stdout.write(f"{runs} run(s) per mode, GET {options['path']}")
+        for label, flag in (('cold', '0'), ('warmed', '1')):
+            results = [self._probe(options['path'], flag) for _ in range(runs)]
+            median = {key: statistics.median(r[key] for r in results) for key in ('setup', 'warmup', 'import', 'first', 'second')}
+            self.stdout.write(
+                f"{label:>6}: import {median['import'] * 1000:6.0f}ms "
+                f"(setup {median['setup'] * 1000:.0f}ms, warm-up {median['warmup'] * 1000:.0f}ms), "
+                f"first response {median['first'] * 1000:6.1f}ms, "
+                f"second {median['second'] * 1000:.1f}ms, "
+                f"time to first response {(median['import'] + median['first']) * 1000:6.0f}ms  "
+                f"[{results[-1]['status']}]"
+            )
+
+    def _probe(self, path: str, warmup: str) -> dict:
+        env = {
+            **os.environ,
+            'DJANGO_WARMUP': warmup,
+            'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'cftlite.settings'),
+            'DJANGO_TRACKER_LOG_LEVEL': 'WARNING',
+        }
+        completed = subprocess.run(
+            [sys.executable, '-c', _PROBE, path],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if completed.returncode != 0:
+            raise SystemExit(f'Startup probe failed:\n{completed.stderr}')
+        return json.loads(completed.stdout.strip().splitlines()[-1])
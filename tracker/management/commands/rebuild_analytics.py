@@ -0,0 +1,54 @@
+from dataclasses import dataclass
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from tracker import analytics
+from tracker.models import ClinicDailyStats
+
+
+@dataclass
+class RebuildStats:
+    rows: int = 0
+    mismatched: int = 0
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the per-clinic daily analytics from follow-ups, view logs and archive segments, '
+        'and replace the stored rows. With --check, only report rows that differ.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Compare with the stored rows and exit non-zero on drift')
+
+    def handle(self, *args, **options):
+        expected = analytics.recompute()
+        stored = {
+            (row.clinic_id, row.day): {name: getattr(row, name) for name in analytics.COUNTERS}
+            for row in ClinicDailyStats.objects.iterator(chunk_size=2000)
+        }
+        stored = {key: counters for key, counters in stored.items() if any(counters.values())}
+
+        stats = RebuildStats(rows=len(expected))
+        for key in sorted(expected.keys() | stored.keys()):
+            if expected.get(key) != stored.get(key):
+                stats.mismatched += 1
+                if options['check']:
+                    clinic_id, day = key
+                    self.stdout.write(f'Clinic {clinic_id} {day.isoformat()}: stored {stored.get(key)}, expected {expected.get(key)}')
+
+        self.stdout.write(f'Rows: {stats.rows}')
+        self.stdout.write(f'Mismatched: {stats.mismatched}')
+        if options['check']:
+            if stats.mismatched:
+                raise SystemExit(1)
+            return
+
+        with transaction.atomic():
+            ClinicDailyStats.objects.all().delete()
+            ClinicDailyStats.objects.bulk_create(
+                [ClinicDailyStats(clinic_id=clinic_id, day=day, **counters) for (clinic_id, day), counters in expected.items()],
+                batch_size=1000,
+            )
+        self.stdout.write('Replaced stored rows')
@@ -0,0 +1,103 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from tracker.models import Clinic, FollowUp, FollowUpReminder
+from tracker.reminders import Reminder, get_reminder_backend, public_url_for
+
+
+@dataclass
+class ReminderStats:
+    scanned: int = 0
+    sent: int = 0
+    failed: int = 0
+
+
+class Command(BaseCommand):
+    help = (
+        'Send reminders for pending follow-ups due within the next --days days, across all clinics. '
+        'Follow-ups already reminded for their current due date are skipped, so reruns are safe.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=2, help='Remind follow-ups due from today up to this many days ahead')
+        parser.add_argument('--batch-size', type=int, default=500, help='Follow-ups fetched per query')
+        parser.add_argument('--workers', type=int, default=8, help='Concurrent sends')
+        parser.add_argument('--backend', help='Dotted path of the sender backend (defaults to REMINDER_BACKEND)')
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        until = today + timedelta(days=max(0, options['days']))
+        batch_size = max(1, options['batch_size'])
+        backend = get_reminder_backend(options['backend'])
+
+        stats = ReminderStats()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as pool:
+            for alias in sorted(set(Clinic.objects.values_list('shard', flat=True))):
+                self._dispatch_shard(alias, today, until, batch_size, backend, pool, stats)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(f'Reminders due {today.isoformat()}..{until.isoformat()}')
+        self.stdout.write(f'Scanned: {stats.scanned}')
+        self.stdout.write(f'Sent: {stats.sent}')
+        self.stdout.write(f'Failed: {stats.failed}')
+        self.stdout.write(f'Elapsed: {elapsed:.2f}s ({stats.sent / elapsed if elapsed else 0:.1f} reminders/s)')
+
+    def _dispatch_shard(self, alias, today, until, batch_size, backend, pool, stats: ReminderStats) -> None:
+        already_sent = FollowUpReminder.objects.filter(followup_id=OuterRef('pk'), due_date=OuterRef('due_date'))
+        # Served by followup_status_due_idx; walked as a (due_date, id) keyset.
+        due_qs = (
+            FollowUp.objects.using(alias)
+            .filter(status=FollowUp.Status.PENDING, due_date__gte=today, due_date__lte=until)
+            .exclude(Exists(already_sent))
+            .order_by('due_date', 'id')
+            .values_list('id', 'clinic_id', 'patient_name', 'phone', 'language', 'due_date', 'public_token')
+        )
+
+        cursor = None
+        while True:
+            page_qs = due_qs
+            if cursor:
+                page_qs = page_qs.filter(Q(due_date__gt=cursor[0]) | Q(due_date=cursor[0], id__gt=cursor[1]))
+            rows = list(page_qs[:batch_size])
+            if not rows:
+                break
+
+            reminders = [
+                Reminder(
+                    followup_id=pk,
+                    clinic_id=clinic_id,
+                    patient_name=patient_name,
+                    phone=phone,
+                    language=language,
+                    due_date=due_date,
+                    public_url=public_url_for(public_token),
+                )
+                for pk, clinic_id, patient_name, phone, language, due_date, public_token in rows
+            ]
+            results = list(pool.map(lambda reminder: self._send(backend, reminder), reminders))
+            delivered = [reminder for reminder, ok in zip(reminders, results) if ok]
+
+            FollowUpReminder.objects.using(alias).bulk_create(
+                [FollowUpReminder(followup_id=r.followup_id, due_date=r.due_date) for r in delivered],
+                ignore_conflicts=True,
+            )
+
+            stats.scanned += len(rows)
+            stats.sent += len(delivered)
+            stats.failed += len(rows) - len(delivered)
+            cursor = (rows[-1][5], rows[-1][0])
+
+    def _send(self, backend, reminder: Reminder) -> bool:
+        try:
+            backend.send(reminder)
+        except Exception as exc:
+            self.stderr.write(f'Follow-up {reminder.followup_id}: reminder failed ({exc})')
+            return False
+        return True
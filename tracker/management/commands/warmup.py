@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from tracker.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = (
+        'Run the worker warm-up steps (views, URL names, templates, forms, database connections) '
+        'and report how long each took. cftlite.wsgi/asgi run the same steps at startup.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skip-databases', action='store_true', help='Do not open database connections')
+
+    def handle(self, *args, **options):
+        report = warm_up(databases=not options['skip_databases'])
+
+        for name, seconds in report.steps.items():
+            self.stdout.write(f'{name:>10}: {seconds * 1000:7.1f}ms')
+        self.stdout.write(f'URL names: {report.urls}')
+        self.stdout.write(f'Templates: {report.templates}')
+        self.stdout.write(f'Databases: {report.databases}')
+        self.stdout.write(f'Total: {report.total * 1000:.1f}ms')
+        if report.failed:
+            raise SystemExit(f"Failed steps: {', '.join(report.failed)}")
@@ -36,8 +36,10 @@ class Migration(migrations.Migration):
                 ('public_token', models.CharField(editable=False, max_length=64, unique=True)),
                 ('created_at', models.DateTimeField(auto_now_add=True)),
                 ('updated_at', models.DateTimeField(auto_now=True)),
-                ('clinic', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='followups', to='tracker.clinic')),
-                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='created_followups', to=settings.AUTH_USER_MODEL)),
+                # Created without FK constraints (0002 drops them anyway): on a
+                # shard, tracker_clinic and auth_user do not exist.
+                ('clinic', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.PROTECT, related_name='followups', to='tracker.clinic')),
+                ('created_by', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.PROTECT, related_name='created_followups', to=settings.AUTH_USER_MODEL)),
             ],
         ),
         migrations.CreateModel(
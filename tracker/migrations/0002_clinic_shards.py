@@ -0,0 +1,67 @@
+# Generated by Django 5.1.15 on 2026-10-18 22:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, migrations, models
+
+
+def populate_directory(apps, schema_editor):
+    # Existing follow-ups all live on `default`; register them under their
+    # current ids so links and edit URLs keep working.
+    if schema_editor.connection.alias != DEFAULT_DB_ALIAS:
+        return
+    FollowUp = apps.get_model('tracker', 'FollowUp')
+    FollowUpDirectory = apps.get_model('tracker', 'FollowUpDirectory')
+    last_id = 0
+    while True:
+        rows = list(
+            FollowUp.objects.using(DEFAULT_DB_ALIAS)
+            .filter(id__gt=last_id)
+            .order_by('id')
+            .values_list('id', 'public_token', 'clinic_id')[:1000]
+        )
+        if not rows:
+            break
+        FollowUpDirectory.objects.using(DEFAULT_DB_ALIAS).bulk_create(
+            [FollowUpDirectory(id=pk, public_token=token, clinic_id=clinic_id) for pk, token, clinic_id in rows]
+        )
+        last_id = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clinic',
+            name='shard',
+            field=models.CharField(default='default', editable=False, max_length=64),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='followup',
+            name='clinic',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.PROTECT, related_name='followups', to='tracker.clinic'),
+        ),
+        migrations.AlterField(
+            model_name='followup',
+            name='created_by',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.PROTECT, related_name='created_followups', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.CreateModel(
+            name='FollowUpDirectory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('public_token', models.CharField(max_length=64, unique=True)),
+                ('clinic', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='tracker.clinic')),
+            ],
+            options={
+                'verbose_name_plural': 'follow-up directory',
+            },
+        ),
+        migrations.RunPython(populate_directory, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.15 on 2026-10-18 22:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0002_clinic_shards'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FollowUpReminder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('due_date', models.DateField()),
+                ('sent_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='followup',
+            index=models.Index(fields=['status', 'due_date', 'id'], name='followup_status_due_idx'),
+        ),
+        migrations.AddField(
+            model_name='followupreminder',
+            name='followup',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminders', to='tracker.followup'),
+        ),
+        migrations.AddConstraint(
+            model_name='followupreminder',
+            constraint=models.UniqueConstraint(fields=('followup', 'due_date'), name='unique_reminder_per_due_date'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.15 on 2026-10-18 22:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0003_followup_reminders'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='followup',
+            index=models.Index(fields=['clinic', 'status', 'due_date'], name='followup_clinic_status_due_idx'),
+        ),
+    ]
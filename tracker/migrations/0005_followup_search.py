@@ -0,0 +1,47 @@
+# Generated by Django 5.1.15 on 2026-10-18 22:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+from tracker import search
+
+
+def backfill_search(apps, schema_editor):
+    FollowUp = apps.get_model('tracker', 'FollowUp')
+    using = schema_editor.connection.alias
+    search.create_name_index(schema_editor.connection)
+    last_id = 0
+    while True:
+        rows = list(FollowUp.objects.using(using).filter(id__gt=last_id).order_by('id')[:1000])
+        if not rows:
+            break
+        for followup in rows:
+            followup.phone_digits = search.phone_digits(followup.phone)
+        FollowUp.objects.using(using).bulk_update(rows, ['phone_digits'])
+        search.index_names(using, [(f.id, f.clinic_id, f.patient_name) for f in rows])
+        last_id = rows[-1].id
+
+
+def drop_search(apps, schema_editor):
+    search.drop_name_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0004_followup_overdue_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='followup',
+            name='phone_digits',
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+        migrations.AddIndex(
+            model_name='followup',
+            index=models.Index(fields=['clinic', 'phone_digits'], name='followup_clinic_phone_idx'),
+        ),
+        migrations.RunPython(backfill_search, drop_search),
+    ]
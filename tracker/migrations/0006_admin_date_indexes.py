@@ -0,0 +1,23 @@
+# Generated by Django 5.1.15 on 2026-10-18 22:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0005_followup_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='followup',
+            index=models.Index(fields=['due_date'], name='followup_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publicviewlog',
+            index=models.Index(fields=['viewed_at'], name='viewlog_viewed_at_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.15 on 2026-10-18 22:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0006_admin_date_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedFollowUp',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('public_token', models.CharField(max_length=64, unique=True)),
+                ('segment', models.CharField(max_length=255)),
+                ('line_no', models.PositiveIntegerField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('clinic', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='tracker.clinic')),
+            ],
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.1.15 on 2026-10-18 22:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_completed_at(apps, schema_editor):
+    # The best completion time available for existing done rows is their last update.
+    FollowUp = apps.get_model('tracker', 'FollowUp')
+    FollowUp.objects.using(schema_editor.connection.alias).filter(status='done').update(
+        completed_at=F('updated_at')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0007_archived_followups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=32, unique=True)),
+                ('position', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='followup',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='ClinicDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('created', models.IntegerField(default=0)),
+                ('due', models.IntegerField(default=0)),
+                ('completed', models.IntegerField(default=0)),
+                ('completion_seconds', models.BigIntegerField(default=0)),
+                ('views', models.IntegerField(default=0)),
+                ('clinic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='tracker.clinic')),
+            ],
+            options={
+                'verbose_name_plural': 'clinic daily stats',
+                'constraints': [models.UniqueConstraint(fields=('clinic', 'day'), name='unique_clinic_daily_stats')],
+            },
+        ),
+        migrations.RunPython(backfill_completed_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.15 on 2026-10-18 22:21
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0008_clinic_analytics'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FollowUpTombstone',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('reason', models.CharField(choices=[('deleted', 'Deleted'), ('archived', 'Archived')], max_length=10)),
+                ('removed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='followup',
+            index=models.Index(fields=['clinic', 'updated_at', 'id'], name='followup_clinic_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='followuptombstone',
+            name='clinic',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='tracker.clinic'),
+        ),
+        migrations.AddIndex(
+            model_name='followuptombstone',
+            index=models.Index(fields=['clinic', 'removed_at', 'id'], name='tombstone_clinic_removed_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 22:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0009_followup_change_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='followup',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 23:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0010_followup_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clinicdailystats',
+            name='due_completed',
+            field=models.IntegerField(default=0),
+        ),
+    ]
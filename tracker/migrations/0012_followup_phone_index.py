@@ -0,0 +1,19 @@
+# Generated by Django 5.1.15 on 2026-10-18 23:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0011_clinic_daily_due_completed'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='followup',
+            index=models.Index(fields=['phone_digits'], name='followup_phone_idx'),
+        ),
+    ]
@@ -1,9 +1,13 @@
 import secrets
+from collections import defaultdict
 
 from django.conf import settings
-from django.db import models
+from django.db import models, router
 from django.utils import timezone
 
+from . import analytics, search
+from .sharding import pick_shard_for_new_clinic, shard_for_clinic
+
 
 def _generate_unique_value(*, model_cls: type[models.Model], field_name: str, generator) -> str:
 	for _ in range(50):
@@ -13,9 +17,16 @@ def _generate_unique_value(*, model_cls: type[models.Model], field_name: str, ge
 	raise RuntimeError(f"Unable to generate unique {model_cls.__name__}.{field_name}")
 
 
+class FollowUpConflictError(Exception):
+	"""A follow-up was saved by someone else after this copy of it was read."""
+
+
 class Clinic(models.Model):
 	name = models.CharField(max_length=255)
 	clinic_code = models.CharField(max_length=32, unique=True, editable=False)
+	# Database alias holding this clinic's follow-ups and view logs.
+	# Changed only by the `move_clinic_shard` command.
+	shard = models.CharField(max_length=64, editable=False)
 	created_at = models.DateTimeField(auto_now_add=True)
 
 	def save(self, *args, **kwargs):
@@ -25,6 +36,8 @@ class Clinic(models.Model):
 				field_name='clinic_code',
 				generator=lambda: secrets.token_hex(4),
 			)
+		if not self.shard:
+			self.shard = pick_shard_for_new_clinic()
 		return super().save(*args, **kwargs)
 
 	def __str__(self) -> str:
@@ -39,6 +52,50 @@ class UserProfile(models.Model):
 		return f"{self.user.username} -> {self.clinic}"
 
 
+class FollowUpQuerySet(models.QuerySet):
+	"""Without ``using()``, new follow-ups go to their clinic's shard.
+
+	A plain queryset gives the router no instance to look at, so ``create`` and
+	``bulk_create`` resolve the shard from each row's clinic themselves.
+	"""
+
+	def create(self, **kwargs):
+		if self._db is not None:
+			return super().create(**kwargs)
+		obj = self.model(**kwargs)
+		self._for_write = True
+		# With no database given, save() asks the router, which routes new rows by clinic.
+		obj.save(force_insert=True)
+		return obj
+
+	def bulk_create(self, objs, batch_size=None):
+		"""Insert ``objs`` without calling save(), but keep what save() maintains.
+
+		Each new row takes its id from the directory, and its derived columns,
+		name index and analytics are filled in as a save() would.
+		"""
+		objs = list(objs)
+		if self._db is None:
+			by_shard = defaultdict(list)
+			shards = {}
+			for obj in objs:
+				if obj.clinic_id not in shards:
+					shards[obj.clinic_id] = shard_for_clinic(obj.clinic_id)
+				by_shard[shards[obj.clinic_id]].append(obj)
+			for alias, group in by_shard.items():
+				self.using(alias).bulk_create(group, batch_size=batch_size)
+			return objs
+
+		for obj in objs:
+			obj._set_derived_fields()
+			if obj.pk is None:
+				obj._register()
+		super().bulk_create(objs, batch_size=batch_size)
+		search.index_names(self.db, [(obj.pk, obj.clinic_id, obj.patient_name) for obj in objs])
+		analytics.record_created(objs)
+		return objs
+
+
 class FollowUp(models.Model):
 	class Language(models.TextChoices):
 		EN = 'en', 'English'
@@ -48,14 +105,19 @@ class FollowUp(models.Model):
 		PENDING = 'pending', 'Pending'
 		DONE = 'done', 'Done'
 
-	clinic = models.ForeignKey(Clinic, on_delete=models.PROTECT, related_name='followups')
+	# Clinics and users live on `default` while follow-ups may live on a shard,
+	# so these relations cannot be enforced by database constraints.
+	clinic = models.ForeignKey(Clinic, on_delete=models.PROTECT, related_name='followups', db_constraint=False)
 	created_by = models.ForeignKey(
 		settings.AUTH_USER_MODEL,
 		on_delete=models.PROTECT,
 		related_name='created_followups',
+		db_constraint=False,
 	)
 	patient_name = models.CharField(max_length=255)
 	phone = models.CharField(max_length=32)
+	# Digits-only copy of `phone` for indexed prefix search; set in save().
+	phone_digits = models.CharField(max_length=32, blank=True, editable=False)
 	language = models.CharField(max_length=2, choices=Language.choices, default=Language.EN)
 	notes = models.TextField(blank=True)
 	due_date = models.DateField()
@@ -63,15 +125,165 @@ class FollowUp(models.Model):
 	public_token = models.CharField(max_length=64, unique=True, editable=False)
 	created_at = models.DateTimeField(auto_now_add=True)
 	updated_at = models.DateTimeField(auto_now=True)
+	# Set when status becomes done, cleared when reopened; drives analytics and archiving.
+	completed_at = models.DateTimeField(null=True, blank=True, editable=False)
+	# Bumped by every save and bulk update; saves only apply on top of the version they read.
+	version = models.PositiveIntegerField(default=1, editable=False)
+
+	class Meta:
+		indexes = [
+			# Keyset scans of pending follow-ups by due date (reminders).
+			models.Index(fields=['status', 'due_date', 'id'], name='followup_status_due_idx'),
+			# Per-clinic status/overdue filters and counts (due_date < today AND status = pending).
+			models.Index(fields=['clinic', 'status', 'due_date'], name='followup_clinic_status_due_idx'),
+			models.Index(fields=['clinic', 'phone_digits'], name='followup_clinic_phone_idx'),
+			# Admin phone search, which spans clinics.
+			models.Index(fields=['phone_digits'], name='followup_phone_idx'),
+			# Admin due-date filter (range lookups, MIN/MAX for the year choices).
+			models.Index(fields=['due_date'], name='followup_due_idx'),
+			# Change feed: a clinic's rows in (updated_at, id) cursor order.
+			models.Index(fields=['clinic', 'updated_at', 'id'], name='followup_clinic_updated_idx'),
+		]
+
+	objects = FollowUpQuerySet.as_manager()
+
+	# Columns whose previous values analytics needs to apply a change.
+	_tracked_fields = ('status', 'due_date', 'completed_at')
+
+	@classmethod
+	def from_db(cls, db, field_names, values):
+		instance = super().from_db(db, field_names, values)
+		instance._loaded_values = dict(zip(field_names, values))
+		return instance
+
+	def refresh_from_db(self, using=None, fields=None, **kwargs):
+		super().refresh_from_db(using, fields, **kwargs)
+		self._remember_stored(fields)
+
+	def _remember_stored(self, fields=None) -> None:
+		"""Record the current values of ``fields`` (default: all loaded) as what the row holds."""
+		deferred = self.get_deferred_fields()
+		attnames = None if fields is None else {self._meta.get_field(name).attname for name in fields}
+		self._loaded_values = {
+			**getattr(self, '_loaded_values', {}),
+			**{
+				field.attname: getattr(self, field.attname)
+				for field in self._meta.concrete_fields
+				if field.attname not in deferred and (attnames is None or field.attname in attnames)
+			},
+		}
+
+	def _dirty_fields(self) -> set[str] | None:
+		"""Names of fields changed since the row was read or saved, or None if that is unknown."""
+		loaded = getattr(self, '_loaded_values', None)
+		fields = [field for field in self._meta.concrete_fields if not field.primary_key]
+		if loaded is None or any(field.attname not in loaded for field in fields):
+			return None
+		return {field.name for field in fields if getattr(self, field.attname) != loaded[field.attname]}
+
+	def _previous_values(self) -> dict | None:
+		if self._state.adding:
+			return None
+		loaded = getattr(self, '_loaded_values', {})
+		if all(name in loaded for name in self._tracked_fields):
+			return {name: loaded[name] for name in self._tracked_fields}
+		return (
+			FollowUp.objects.using(self._state.db or router.db_for_write(FollowUp, instance=self))
+			.filter(pk=self.pk)
+			.values(*self._tracked_fields)
+			.first()
+		)
 
 	def save(self, *args, **kwargs):
-		if not self.public_token:
-			self.public_token = _generate_unique_value(
-				model_cls=FollowUp,
+		updating = not self._state.adding and not kwargs.get('force_insert')
+		if updating and kwargs.get('update_fields') is None:
+			dirty = self._dirty_fields()
+			if dirty is not None:
+				if not dirty - {'version'}:
+					return None
+				# Write only the changed columns (derived ones are added below).
+				kwargs['update_fields'] = {*dirty, 'updated_at'}
+		if updating:
+			# Optimistic concurrency: the UPDATE only matches the version this
+			# instance was based on (see _do_update) and moves it forward.
+			expected_version = self.version
+			self.version = expected_version + 1
+			if kwargs.get('update_fields') is not None:
+				kwargs['update_fields'] = {*kwargs['update_fields'], 'version'}
+
+		update_fields = kwargs.get('update_fields')
+		track_changes = update_fields is None or bool(set(update_fields) & {'status', 'due_date'})
+		previous = self._previous_values() if track_changes else None
+
+		self._set_derived_fields()
+		if update_fields is not None and 'status' in update_fields:
+			update_fields = kwargs['update_fields'] = {*update_fields, 'completed_at'}
+		if update_fields is not None and 'phone' in update_fields:
+			update_fields = kwargs['update_fields'] = {*update_fields, 'phone_digits'}
+
+		if self.pk is None:
+			self._register()
+
+		self._expected_version = expected_version if updating else None
+		self._version_conflict = False
+		try:
+			result = super().save(*args, **kwargs)
+		finally:
+			self._expected_version = None
+		if self._version_conflict:
+			# Raised out here rather than from _do_update, where Django would
+			# mark an enclosing transaction for rollback.
+			self.version = expected_version
+			raise FollowUpConflictError(f'Follow-up {self.pk} was changed or removed since version {expected_version} was read')
+		if update_fields is None or {'patient_name', 'clinic', 'clinic_id'} & set(update_fields):
+			search.index_names(self._state.db, [(self.pk, self.clinic_id, self.patient_name)])
+		if track_changes:
+			analytics.record_followup_change(self, previous)
+		self._remember_stored(update_fields)
+		return result
+
+	def _set_derived_fields(self) -> None:
+		if self.status == FollowUp.Status.DONE and self.completed_at is None:
+			self.completed_at = timezone.now()
+		elif self.status != FollowUp.Status.DONE:
+			self.completed_at = None
+		self.phone_digits = search.phone_digits(self.phone)
+
+	def _register(self) -> None:
+		# Register in the global directory first: it hands out ids that stay
+		# unique across shards and resolves public tokens to a clinic.
+		entry = FollowUpDirectory.objects.create(
+			public_token=self.public_token or _generate_unique_value(
+				model_cls=FollowUpDirectory,
 				field_name='public_token',
 				generator=lambda: secrets.token_urlsafe(18)[:32],
-			)
-		return super().save(*args, **kwargs)
+			),
+			clinic_id=self.clinic_id,
+		)
+		self.pk = entry.pk
+		self.public_token = entry.public_token
+
+	def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+		expected_version = getattr(self, '_expected_version', None)
+		if expected_version is None:
+			return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+		versioned_qs = base_qs.filter(version=expected_version)
+		if not super()._do_update(versioned_qs, using, pk_val, values, update_fields, forced_update):
+			# Nothing was written; report success so Django neither raises nor falls back to an INSERT.
+			self._version_conflict = True
+		return True
+
+	def delete(self, using=None, keep_parents=False):
+		using = using or router.db_for_write(FollowUp, instance=self)
+		pk = self.pk
+		removal = analytics.removal_deltas(
+			using, [(pk, self.clinic_id, self.created_at, self.due_date, self.completed_at)]
+		)
+		result = super().delete(using=using, keep_parents=keep_parents)
+		search.unindex_names(using, [pk])
+		FollowUpTombstone.record([(pk, self.clinic_id)], FollowUpTombstone.Reason.DELETED)
+		analytics.apply_deltas(removal)
+		return result
 
 	@property
 	def is_overdue(self) -> bool:
@@ -81,11 +293,133 @@ class FollowUp(models.Model):
 		return f"{self.patient_name} ({self.phone}) - {self.status}"
 
 
+class FollowUpDirectory(models.Model):
+	"""Global (``default`` database) index of every follow-up.
+
+	``id`` is the follow-up's primary key on whichever shard holds it, and
+	``public_token`` lets `/p/<token>/` find that shard with one lookup.
+	"""
+
+	public_token = models.CharField(max_length=64, unique=True)
+	clinic = models.ForeignKey(Clinic, on_delete=models.PROTECT, related_name='+')
+
+	class Meta:
+		verbose_name_plural = 'follow-up directory'
+
+	def __str__(self) -> str:
+		return f"{self.public_token} -> {self.clinic_id}"
+
+
 class PublicViewLog(models.Model):
 	followup = models.ForeignKey(FollowUp, on_delete=models.CASCADE, related_name='public_view_logs')
 	viewed_at = models.DateTimeField(auto_now_add=True)
 	user_agent = models.CharField(max_length=255, blank=True)
 	ip_address = models.CharField(max_length=64, blank=True)
 
+	class Meta:
+		indexes = [
+			# Admin date filter on a table that grows with every public visit.
+			models.Index(fields=['viewed_at'], name='viewlog_viewed_at_idx'),
+		]
+
 	def __str__(self) -> str:
 		return f"{self.followup_id} @ {self.viewed_at.isoformat()}"
+
+
+class FollowUpReminder(models.Model):
+	"""A reminder sent for a follow-up's due date; one per (follow-up, due date)."""
+
+	followup = models.ForeignKey(FollowUp, on_delete=models.CASCADE, related_name='reminders')
+	due_date = models.DateField()
+	sent_at = models.DateTimeField(auto_now_add=True)
+
+	class Meta:
+		constraints = [
+			models.UniqueConstraint(fields=['followup', 'due_date'], name='unique_reminder_per_due_date'),
+		]
+
+	def __str__(self) -> str:
+		return f"{self.followup_id} for {self.due_date.isoformat()}"
+
+
+class ArchivedFollowUp(models.Model):
+	"""Index (on ``default``) of a follow-up moved to cold storage by `archive_followups`."""
+
+	id = models.BigIntegerField(primary_key=True)
+	public_token = models.CharField(max_length=64, unique=True)
+	clinic = models.ForeignKey(Clinic, on_delete=models.PROTECT, related_name='+')
+	segment = models.CharField(max_length=255)
+	line_no = models.PositiveIntegerField()
+	archived_at = models.DateTimeField(auto_now_add=True)
+
+	def __str__(self) -> str:
+		return f"{self.public_token} in {self.segment}:{self.line_no}"
+
+
+class FollowUpTombstone(models.Model):
+	"""Marker (on ``default``) left when a follow-up leaves its shard, for the change feed."""
+
+	class Reason(models.TextChoices):
+		DELETED = 'deleted', 'Deleted'
+		ARCHIVED = 'archived', 'Archived'
+
+	id = models.BigIntegerField(primary_key=True)
+	clinic = models.ForeignKey(Clinic, on_delete=models.PROTECT, related_name='+')
+	reason = models.CharField(max_length=10, choices=Reason.choices)
+	removed_at = models.DateTimeField(default=timezone.now)
+
+	class Meta:
+		indexes = [
+			models.Index(fields=['clinic', 'removed_at', 'id'], name='tombstone_clinic_removed_idx'),
+		]
+
+	def __str__(self) -> str:
+		return f"{self.pk} {self.reason}"
+
+	@classmethod
+	def record(cls, rows, reason: str) -> None:
+		"""Add tombstones for ``(followup_id, clinic_id)`` rows; existing ones are kept."""
+		now = timezone.now()
+		cls.objects.bulk_create(
+			[cls(id=pk, clinic_id=clinic_id, reason=reason, removed_at=now) for pk, clinic_id in rows],
+			ignore_conflicts=True,
+		)
+
+
+class ClinicDailyStats(models.Model):
+	"""Per-clinic counters for one day, maintained incrementally (see tracker.analytics).
+
+	``created`` and ``completed`` count by the day it happened, ``due`` by due
+	date, ``views`` by visit day; ``completion_seconds`` sums created-to-done time
+	of that day's completions. ``due_completed`` counts, by due date, the
+	follow-ups that are done, however late.
+	"""
+
+	clinic = models.ForeignKey(Clinic, on_delete=models.CASCADE, related_name='+')
+	day = models.DateField()
+	created = models.IntegerField(default=0)
+	due = models.IntegerField(default=0)
+	due_completed = models.IntegerField(default=0)
+	completed = models.IntegerField(default=0)
+	completion_seconds = models.BigIntegerField(default=0)
+	views = models.IntegerField(default=0)
+
+	class Meta:
+		verbose_name_plural = 'clinic daily stats'
+		constraints = [
+			models.UniqueConstraint(fields=['clinic', 'day'], name='unique_clinic_daily_stats'),
+		]
+
+	def __str__(self) -> str:
+		return f"{self.clinic_id} @ {self.day.isoformat()}"
+
+
+class AnalyticsWatermark(models.Model):
+	"""How far an incremental analytics feed has been applied."""
+
+	name = models.CharField(max_length=32, unique=True)
+	position = models.DateTimeField(null=True, blank=True)
+	updated_at = models.DateTimeField(auto_now=True)
+
+	def __str__(self) -> str:
+		return f"{self.name} @ {self.position}"
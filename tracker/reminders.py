@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import json
+import sys
+import threading
+from dataclasses import asdict, dataclass
+from datetime import date
+from pathlib import Path
+
+from django.conf import settings
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+
+@dataclass(frozen=True)
+class Reminder:
+	followup_id: int
+	clinic_id: int
+	patient_name: str
+	phone: str
+	language: str
+	due_date: date
+	public_url: str
+
+	@property
+	def message(self) -> str:
+		if self.language == 'hi':
+			return f'{self.patient_name}, आपका फ़ॉलो-अप {self.due_date.isoformat()} को है। विवरण: {self.public_url}'
+		return f'{self.patient_name}, your follow-up is due on {self.due_date.isoformat()}. Details: {self.public_url}'
+
+
+def public_url_for(public_token: str) -> str:
+	base_url = getattr(settings, 'PUBLIC_BASE_URL', '').rstrip('/')
+	return base_url + reverse('public_followup', kwargs={'public_token': public_token})
+
+
+class BaseReminderBackend:
+	"""Deliver reminders. ``send`` is called concurrently from worker threads and
+	must raise on failure so the reminder is retried on the next run."""
+
+	def send(self, reminder: Reminder) -> None:
+		raise NotImplementedError
+
+
+class ConsoleReminderBackend(BaseReminderBackend):
+	def __init__(self, stream=None):
+		self.stream = stream or sys.stdout
+		self._lock = threading.Lock()
+
+	def send(self, reminder: Reminder) -> None:
+		with self._lock:
+			self.stream.write(f'[reminder] to={reminder.phone} followup={reminder.followup_id} {reminder.message}\n')
+			self.stream.flush()
+
+
+class FileReminderBackend(BaseReminderBackend):
+	"""Append one JSON line per reminder to ``REMINDER_FILE_PATH``."""
+
+	def __init__(self, path: str | Path | None = None):
+		self.path = Path(path or settings.REMINDER_FILE_PATH)
+		self._lock = threading.Lock()
+
+	def send(self, reminder: Reminder) -> None:
+		payload = {**asdict(reminder), 'due_date': reminder.due_date.isoformat(), 'message': reminder.message}
+		line = json.dumps(payload, ensure_ascii=False)
+		with self._lock, self.path.open('a', encoding='utf-8') as f:
+			f.write(line + '\n')
+
+
+def get_reminder_backend(path: str | None = None, **kwargs) -> BaseReminderBackend:
+	return import_string(path or settings.REMINDER_BACKEND)(**kwargs)
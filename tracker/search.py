@@ -0,0 +1,121 @@
+"""Indexed patient search: digits-only phone prefixes and full-text names.
+
+Names are indexed with an FTS5 table on SQLite, kept in sync from
+``FollowUp.save`` (and the shard move command), and with a FULLTEXT index on
+MySQL, which the server maintains itself.
+"""
+
+from __future__ import annotations
+
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, Q, QuerySet
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'tracker_followup_fts'
+MYSQL_FULLTEXT_INDEX = 'followup_name_ft'
+
+_NON_DIGITS_RE = re.compile(r'\D')
+_PHONE_QUERY_RE = re.compile(r'^[\d\s()+\-]+$')
+_WORD_RE = re.compile(r'\w+')
+
+
+def phone_digits(phone: str) -> str:
+	return _NON_DIGITS_RE.sub('', phone or '')
+
+
+def _clinic_key(clinic_id: int) -> str:
+	return f'c{clinic_id}'
+
+
+def create_name_index(connection) -> None:
+	with connection.cursor() as cursor:
+		if connection.vendor == 'sqlite':
+			# clinic_key is indexed too, so a clinic-scoped MATCH intersects
+			# posting lists instead of filtering every clinic's hits.
+			cursor.execute(
+				f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+				f"USING fts5(clinic_key, patient_name, tokenize='unicode61 remove_diacritics 2')"
+			)
+		elif connection.vendor == 'mysql':
+			cursor.execute(f'ALTER TABLE tracker_followup ADD FULLTEXT INDEX {MYSQL_FULLTEXT_INDEX} (patient_name)')
+
+
+def drop_name_index(connection) -> None:
+	with connection.cursor() as cursor:
+		if connection.vendor == 'sqlite':
+			cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+		elif connection.vendor == 'mysql':
+			cursor.execute(f'ALTER TABLE tracker_followup DROP INDEX {MYSQL_FULLTEXT_INDEX}')
+
+
+def index_names(using: str, rows) -> None:
+	"""(Re)index ``(id, clinic_id, patient_name)`` rows on database ``using``."""
+	connection = connections[using]
+	if connection.vendor != 'sqlite':
+		return
+	rows = list(rows)
+	if not rows:
+		return
+	with connection.cursor() as cursor:
+		cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(pk,) for pk, _, _ in rows])
+		cursor.executemany(
+			f'INSERT INTO {FTS_TABLE} (rowid, clinic_key, patient_name) VALUES (%s, %s, %s)',
+			[(pk, _clinic_key(clinic_id), name) for pk, clinic_id, name in rows],
+		)
+
+
+def unindex_names(using: str, ids) -> None:
+	connection = connections[using]
+	if connection.vendor != 'sqlite':
+		return
+	with connection.cursor() as cursor:
+		cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(pk,) for pk in ids])
+
+
+def search_followups(qs: QuerySet, clinic_id: int | None, query: str) -> QuerySet:
+	"""Narrow a clinic's follow-up queryset to rows matching ``query``.
+
+	Phone-like input is matched as a prefix of ``phone_digits`` using a range
+	scan on the (clinic, phone_digits) index; anything else is a name search
+	where every word must match as a prefix. With ``clinic_id`` None (the
+	admin) names are matched across clinics, and phones use the
+	``phone_digits`` index.
+	"""
+	query = query.strip()
+	if not query:
+		return qs
+
+	digits = phone_digits(query)
+	if digits and _PHONE_QUERY_RE.match(query):
+		# ':' sorts right after '9', so this is exactly "starts with digits".
+		return qs.filter(phone_digits__gte=digits, phone_digits__lt=digits + ':')
+
+	words = _WORD_RE.findall(query)
+	if not words:
+		return qs.none()
+
+	vendor = connections[qs.db].vendor
+	if vendor == 'sqlite':
+		terms = ' AND '.join('"{}"*'.format(word.replace('"', '')) for word in words)
+		match = f'patient_name : ({terms})'
+		if clinic_id is not None:
+			match = f'clinic_key : {_clinic_key(clinic_id)} AND {match}'
+		return qs.filter(id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match]))
+	if vendor == 'mysql':
+		terms = ' '.join(f'+{word}*' for word in words)
+		# A plain WHERE condition rather than a subquery, so the filter also
+		# works in UPDATEs (MySQL cannot select from the table it updates).
+		return qs.filter(
+			RawSQL(
+				'MATCH(tracker_followup.patient_name) AGAINST (%s IN BOOLEAN MODE)',
+				[terms],
+				output_field=BooleanField(),
+			)
+		)
+
+	name_q = Q()
+	for word in words:
+		name_q &= Q(patient_name__icontains=word)
+	return qs.filter(name_q)
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Models whose rows live on the owning clinic's shard. Everything else
+# (clinics, users, profiles, the follow-up directory) stays on `default`.
+SHARDED_MODELS = {'tracker.followup', 'tracker.publicviewlog', 'tracker.followupreminder'}
+
+
+def placement_shards() -> list[str]:
+	return list(getattr(settings, 'CLINIC_SHARDS', None) or [DEFAULT_DB_ALIAS])
+
+
+def pick_shard_for_new_clinic() -> str:
+	from django.db.models import Count
+
+	from .models import Clinic
+
+	candidates = placement_shards()
+	counts = dict(
+		Clinic.objects.using(DEFAULT_DB_ALIAS)
+		.filter(shard__in=candidates)
+		.values_list('shard')
+		.annotate(n=Count('id'))
+	)
+	return min(candidates, key=lambda alias: (counts.get(alias, 0), candidates.index(alias)))
+
+
+def shard_for_clinic(clinic_id: int) -> str:
+	from .models import Clinic
+
+	shard = Clinic.objects.using(DEFAULT_DB_ALIAS).filter(pk=clinic_id).values_list('shard', flat=True).first()
+	return shard or DEFAULT_DB_ALIAS
+
+
+class ClinicShardRouter:
+	"""Route follow-ups and view logs to the database of the clinic that owns them.
+
+	Querysets carry no clinic hint, so views pass ``.using(alias)`` explicitly
+	and ``FollowUp.objects.create`` looks the shard up itself; this router
+	covers instance saves and related-object access.
+	"""
+
+	def _route(self, model, **hints):
+		if model._meta.label_lower not in SHARDED_MODELS:
+			return DEFAULT_DB_ALIAS
+
+		from .models import Clinic, FollowUp
+
+		instance = hints.get('instance')
+		if isinstance(instance, Clinic):
+			# A clinic's related managers (clinic.followups) use its shard.
+			return instance.shard or DEFAULT_DB_ALIAS
+		if isinstance(instance, FollowUp):
+			if instance._state.adding and instance.clinic_id:
+				return shard_for_clinic(instance.clinic_id)
+			return instance._state.db
+		if instance is not None and instance._meta.label_lower in SHARDED_MODELS:
+			return instance._state.db
+		return None
+
+	def db_for_read(self, model, **hints):
+		return self._route(model, **hints)
+
+	def db_for_write(self, model, **hints):
+		return self._route(model, **hints)
+
+	def allow_relation(self, obj1, obj2, **hints):
+		labels = {obj1._meta.label_lower, obj2._meta.label_lower}
+		if labels & SHARDED_MODELS:
+			return True
+		return None
+
+	def allow_migrate(self, db, app_label, model_name=None, **hints):
+		# Shards get only the sharded tables; `default` (which may also be a
+		# shard) gets everything. Data migrations without a model run everywhere.
+		if db == DEFAULT_DB_ALIAS or model_name is None:
+			return None
+		return f'{app_label}.{model_name}' in SHARDED_MODELS
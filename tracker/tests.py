@@ -1,13 +1,38 @@
+import asyncio
+import tempfile
+import time
 from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
 
+from django.contrib.admin import site
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import call_command
+from django.db import connection, connections
+from django.db.models import F
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 
-from .models import Clinic, FollowUp, PublicViewLog, UserProfile
+from .models import ArchivedFollowUp, Clinic, ClinicDailyStats, FollowUp, FollowUpDirectory, FollowUpReminder, FollowUpTombstone, PublicViewLog, UserProfile
+from . import analytics, archive, search, views, warmup
+from .reminders import BaseReminderBackend
+from .sharding import ClinicShardRouter
+
+
+class RecordingReminderBackend(BaseReminderBackend):
+	sent = []
+
+	def send(self, reminder):
+		RecordingReminderBackend.sent.append(reminder)
 
 
 class TrackerTests(TestCase):
+	# Includes the `shard_b` database that settings add for test runs.
+	databases = '__all__'
+
 	def setUp(self):
 		User = get_user_model()
 
@@ -115,3 +140,503 @@ class TrackerTests(TestCase):
 		resp = self.client.get(reverse('dashboard') + '?page=2')
 		self.assertEqual(resp.status_code, 200)
 		self.assertIn('Page 2', resp.content.decode('utf-8'))
+
+	def test_followup_registered_in_directory(self):
+		entry = FollowUpDirectory.objects.get(public_token=self.followup1.public_token)
+		self.assertEqual(entry.pk, self.followup1.pk)
+		self.assertEqual(entry.clinic_id, self.clinic1.pk)
+		self.assertEqual(self.clinic1.shard, 'default')
+
+	def test_router_places_new_followup_on_clinic_shard(self):
+		Clinic.objects.filter(pk=self.clinic2.pk).update(shard='shard_b')
+		router = ClinicShardRouter()
+		new_followup = FollowUp(clinic_id=self.clinic2.pk, created_by=self.user2)
+		self.assertEqual(router.db_for_write(FollowUp, instance=new_followup), 'shard_b')
+		self.assertEqual(router.db_for_write(FollowUp, instance=self.followup1), 'default')
+		self.assertEqual(router.db_for_read(Clinic, instance=self.followup1), 'default')
+		self.assertTrue(router.allow_migrate('shard_b', 'tracker', 'followup'))
+		self.assertFalse(router.allow_migrate('shard_b', 'tracker', 'clinic'))
+		self.assertFalse(router.allow_migrate('shard_b', 'auth', 'user'))
+		self.assertIsNone(router.allow_migrate('default', 'tracker', 'clinic'))
+
+	@override_settings(CLINIC_SHARDS=['default', 'shard_b'])
+	def test_followups_live_on_their_clinic_shard(self):
+		Clinic.objects.filter(pk=self.clinic2.pk).update(shard='shard_b')
+		due = date.today() + timedelta(days=2)
+		created = FollowUp.objects.create(
+			clinic=self.clinic2, created_by=self.user2, patient_name='Shard Patient', phone='+15550002222', due_date=due
+		)
+		bulk_b, bulk_default = FollowUp.objects.bulk_create([
+			FollowUp(clinic=self.clinic2, created_by=self.user2, patient_name='Bulk Patient', phone='+15550003333', due_date=due),
+			FollowUp(clinic=self.clinic1, created_by=self.user1, patient_name='Bulk Other', phone='+15550004444', due_date=due),
+		])
+		self.assertEqual(
+			set(FollowUp.objects.using('shard_b').values_list('pk', flat=True)), {created.pk, bulk_b.pk}
+		)
+		self.assertTrue(FollowUp.objects.using('default').filter(pk=bulk_default.pk).exists())
+		self.assertEqual(FollowUpDirectory.objects.filter(pk__in=[created.pk, bulk_b.pk, bulk_default.pk]).count(), 3)
+
+		self.client.login(username='u2', password='pass12345')
+		resp = self.client.get(reverse('dashboard'))
+		self.assertEqual({f.pk for f in resp.context['followups']}, {created.pk, bulk_b.pk})
+		resp = self.client.get(reverse('dashboard'), {'q': 'bulk'})
+		self.assertEqual([f.pk for f in resp.context['followups']], [bulk_b.pk])
+		resp = self.client.get(reverse('public_followup', kwargs={'public_token': created.public_token}))
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual(PublicViewLog.objects.using('shard_b').filter(followup_id=created.pk).count(), 1)
+
+		out = StringIO()
+		call_command('move_clinic_shard', clinic=self.clinic2.clinic_code, target='default', stdout=out)
+		self.assertIn('Follow-ups: 2', out.getvalue())
+		self.assertFalse(FollowUp.objects.using('shard_b').exists())
+		self.assertFalse(PublicViewLog.objects.using('shard_b').exists())
+		self.assertEqual(PublicViewLog.objects.using('default').filter(followup_id=created.pk).count(), 1)
+		resp = self.client.get(reverse('dashboard'), {'q': 'bulk'})
+		self.assertEqual([f.pk for f in resp.context['followups']], [bulk_b.pk])
+		resp = self.client.get(reverse('public_followup', kwargs={'public_token': created.public_token}))
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual(PublicViewLog.objects.using('default').filter(followup_id=created.pk).count(), 2)
+		call_command('rebuild_analytics', '--check', stdout=StringIO())
+
+	@override_settings(CLINIC_SHARDS=['default', 'shard_b'])
+	def test_move_clinic_shard_carries_over_rows_written_during_the_move(self):
+		index_names = search.index_names
+		calls = []
+
+		def write_during_copy(using, rows):
+			index_names(using, rows)
+			if calls:
+				return
+			calls.append(using)
+			# Still on `default`: a public visit, an edit and a new follow-up land on the source.
+			PublicViewLog.objects.using('default').create(followup_id=self.followup1.pk)
+			FollowUp.objects.using('default').filter(pk=self.followup1.pk).update(
+				patient_name='Renamed Patient', version=F('version') + 1
+			)
+			FollowUp.objects.create(
+				clinic=self.clinic1, created_by=self.user1, patient_name='Late Patient', phone='+15550005555',
+				due_date=date.today() + timedelta(days=1),
+			)
+
+		out = StringIO()
+		with mock.patch.object(search, 'index_names', side_effect=write_during_copy):
+			call_command('move_clinic_shard', clinic=self.clinic1.clinic_code, target='shard_b', stdout=out)
+		# The new follow-up is picked up by the copy itself, the edit by the catch-up.
+		self.assertIn('Follow-ups: 2', out.getvalue())
+		self.assertIn('Re-copied (changed during the move): 1', out.getvalue())
+		self.assertFalse(FollowUp.objects.using('default').exists())
+		self.assertFalse(PublicViewLog.objects.using('default').exists())
+		moved = FollowUp.objects.using('shard_b').get(pk=self.followup1.pk)
+		self.assertEqual(moved.patient_name, 'Renamed Patient')
+		self.assertEqual(PublicViewLog.objects.using('shard_b').filter(followup=moved).count(), 1)
+		self.assertEqual(
+			sorted(FollowUp.objects.using('shard_b').values_list('patient_name', flat=True)),
+			['Late Patient', 'Renamed Patient'],
+		)
+
+	@override_settings(CLINIC_SHARDS=['default', 'shard_b'])
+	def test_admin_reads_the_selected_shard(self):
+		get_user_model().objects.create_superuser(username='admin', password='pass12345', email='admin@example.com')
+		self.client.login(username='admin', password='pass12345')
+
+		resp = self.client.get(reverse('admin:tracker_followup_changelist'))
+		self.assertEqual(resp.context['cl'].queryset.db, 'default')
+		self.assertContains(resp, '?shard=shard_b')
+		resp = self.client.get(reverse('admin:tracker_followup_changelist'), {'shard': 'unknown'})
+		self.assertEqual(resp.context['cl'].queryset.db, 'default')
+		# The directory knows each follow-up's shard, so change pages need no filter.
+		resp = self.client.get(reverse('admin:tracker_followup_change', args=[self.followup1.pk]))
+		self.assertEqual(resp.status_code, 200)
+
+		# Clinics are not on other shards, so they are prefetched there rather than joined.
+		request = RequestFactory().get('/', {'shard': 'shard_b'})
+		self.assertEqual(site._registry[FollowUp].get_list_select_related(request), ())
+		self.assertEqual(site._registry[PublicViewLog].get_list_select_related(request), ('followup',))
+		self.assertEqual(site._registry[FollowUp].get_queryset(request).db, 'shard_b')
+
+	async def test_async_public_page_logs_view(self):
+		async def anonymous():
+			return AnonymousUser()
+
+		request = AsyncRequestFactory().get(f'/p/{self.followup1.public_token}/')
+		request.auser = anonymous
+		resp = await views.apublic_followup(request, self.followup1.public_token)
+		self.assertEqual(resp.status_code, 200)
+		await asyncio.gather(*views._background_tasks)
+		self.assertEqual(await PublicViewLog.objects.filter(followup_id=self.followup1.pk).acount(), 1)
+
+	async def test_async_export_streams_clinic_rows(self):
+		async def staff_user():
+			return self.user1
+
+		request = AsyncRequestFactory().get(reverse('followups_export_csv'))
+		request.auser = staff_user
+		resp = await views.afollowups_export_csv(request)
+		self.assertEqual(resp.status_code, 200)
+		content = b''.join([chunk async for chunk in resp.streaming_content]).decode('utf-8')
+		self.assertIn('patient_name,phone', content)
+		self.assertIn(self.followup1.public_token, content)
+
+	def test_send_reminders_is_idempotent(self):
+		RecordingReminderBackend.sent = []
+		FollowUp.objects.create(
+			clinic=self.clinic2,
+			created_by=self.user2,
+			patient_name='Later Patient',
+			phone='+15559990000',
+			language=FollowUp.Language.EN,
+			due_date=date.today() + timedelta(days=30),
+			status=FollowUp.Status.PENDING,
+		)
+		backend = 'tracker.tests.RecordingReminderBackend'
+
+		call_command('send_reminders', days=3, backend=backend, stdout=StringIO())
+		self.assertEqual([r.followup_id for r in RecordingReminderBackend.sent], [self.followup1.pk])
+		self.assertTrue(FollowUpReminder.objects.filter(followup=self.followup1, due_date=self.followup1.due_date).exists())
+
+		call_command('send_reminders', days=3, backend=backend, stdout=StringIO())
+		self.assertEqual(len(RecordingReminderBackend.sent), 1)
+
+	def test_dashboard_overdue_filter_and_ordering(self):
+		overdue = FollowUp.objects.create(
+			clinic=self.clinic1,
+			created_by=self.user1,
+			patient_name='Overdue Patient',
+			phone='+15550002222',
+			language=FollowUp.Language.EN,
+			due_date=date.today() - timedelta(days=2),
+			status=FollowUp.Status.PENDING,
+		)
+		FollowUp.objects.create(
+			clinic=self.clinic1,
+			created_by=self.user1,
+			patient_name='Past Done Patient',
+			phone='+15550003333',
+			language=FollowUp.Language.EN,
+			due_date=date.today() - timedelta(days=5),
+			status=FollowUp.Status.DONE,
+		)
+
+		self.client.login(username='u1', password='pass12345')
+		resp = self.client.get(reverse('dashboard') + '?overdue=1')
+		self.assertEqual([f.pk for f in resp.context['followups']], [overdue.pk])
+		self.assertEqual(resp.context['summary']['overdue'], 1)
+
+		resp = self.client.get(reverse('dashboard') + '?sort=overdue')
+		self.assertEqual(resp.context['followups'][0].pk, overdue.pk)
+
+		resp = self.client.get(reverse('followups_export_csv') + '?overdue=1')
+		content = resp.content.decode('utf-8')
+		self.assertIn('Overdue Patient', content)
+		self.assertNotIn('Past Done Patient', content)
+
+	def test_dashboard_search_by_name_and_phone(self):
+		other = FollowUp.objects.create(
+			clinic=self.clinic1,
+			created_by=self.user1,
+			patient_name='Asha Kumar',
+			phone='+91 98765-43210',
+			language=FollowUp.Language.HI,
+			due_date=date.today() + timedelta(days=5),
+			status=FollowUp.Status.PENDING,
+		)
+		FollowUp.objects.create(
+			clinic=self.clinic2,
+			created_by=self.user2,
+			patient_name='Asha Other Clinic',
+			phone='+919876543210',
+			language=FollowUp.Language.EN,
+			due_date=date.today() + timedelta(days=5),
+			status=FollowUp.Status.PENDING,
+		)
+		self.assertEqual(other.phone_digits, '919876543210')
+
+		self.client.login(username='u1', password='pass12345')
+		for query in ('ash kum', 'asha', '+91 9876', '91987'):
+			resp = self.client.get(reverse('dashboard'), {'q': query})
+			self.assertEqual([f.pk for f in resp.context['followups']], [other.pk], query)
+		for query in ('-', '+', '()'):
+			resp = self.client.get(reverse('dashboard'), {'q': query})
+			self.assertEqual(list(resp.context['followups']), [], query)
+
+		other.patient_name = 'Meera Shah'
+		other.save()
+		resp = self.client.get(reverse('dashboard'), {'q': 'asha'})
+		self.assertEqual(list(resp.context['followups']), [])
+
+	def test_bulk_update_is_clinic_scoped_single_update(self):
+		other_clinic = FollowUp.objects.create(
+			clinic=self.clinic2,
+			created_by=self.user2,
+			patient_name='Other Clinic Patient',
+			phone='+15559990000',
+			language=FollowUp.Language.EN,
+			due_date=date.today() + timedelta(days=7),
+			status=FollowUp.Status.PENDING,
+		)
+		before = self.followup1.updated_at
+
+		self.client.login(username='u1', password='pass12345')
+		url = reverse('followups_bulk_update')
+		resp = self.client.post(
+			url,
+			{'action': 'done', 'ids': [self.followup1.pk, other_clinic.pk]},
+			HTTP_ACCEPT='application/json',
+		)
+		self.assertEqual(resp.json(), {'updated': 1})
+		self.followup1.refresh_from_db()
+		other_clinic.refresh_from_db()
+		self.assertEqual(self.followup1.status, FollowUp.Status.DONE)
+		self.assertGreater(self.followup1.updated_at, before)
+		self.assertEqual(other_clinic.status, FollowUp.Status.PENDING)
+
+		new_due = date.today() + timedelta(days=20)
+		resp = self.client.post(
+			url,
+			{'action': 'reschedule', 'scope': 'filter', 'status': 'done', 'due_date': new_due.isoformat()},
+			HTTP_ACCEPT='application/json',
+		)
+		self.assertEqual(resp.json(), {'updated': 1})
+		self.followup1.refresh_from_db()
+		self.assertEqual(self.followup1.due_date, new_due)
+
+		resp = self.client.post(url, {'action': 'reopen', 'ids': [self.followup1.pk]})
+		self.assertEqual(resp.status_code, 302)
+		self.followup1.refresh_from_db()
+		self.assertEqual(self.followup1.status, FollowUp.Status.PENDING)
+
+	def test_admin_followup_search_by_name_phone_token_or_clinic(self):
+		other = FollowUp.objects.create(
+			clinic=self.clinic2, created_by=self.user2, patient_name='Ravi Kumar', phone='+91 98765 43210',
+			due_date=date.today() + timedelta(days=5),
+		)
+		get_user_model().objects.create_superuser(username='admin', password='pass12345', email='admin@example.com')
+		self.client.login(username='admin', password='pass12345')
+		url = reverse('admin:tracker_followup_changelist')
+
+		resp = self.client.get(url)
+		self.assertEqual(resp.context['cl'].paginator.count, 2)
+		for term, expected in [
+			('pat', [self.followup1]),
+			('ravi kum', [other]),
+			('91 987', [other]),
+			('+1 555', [self.followup1]),
+			(self.followup1.public_token, [self.followup1]),
+			(self.clinic2.clinic_code, [other]),
+			('clinic', [self.followup1, other]),
+			('nobody', []),
+		]:
+			resp = self.client.get(url, {'q': term})
+			self.assertEqual(sorted(f.pk for f in resp.context['cl'].result_list), sorted(f.pk for f in expected), term)
+
+	def test_admin_changelists_use_indexed_date_filter(self):
+		User = get_user_model()
+		User.objects.create_superuser(username='admin', password='pass12345', email='admin@example.com')
+		PublicViewLog.objects.create(followup=self.followup1)
+		self.client.login(username='admin', password='pass12345')
+
+		resp = self.client.get(reverse('admin:tracker_publicviewlog_changelist'))
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual(resp.context['cl'].result_count, 1)
+
+		year = date.today().year
+		resp = self.client.get(reverse('admin:tracker_publicviewlog_changelist'), {'viewed_at_period': str(year + 1)})
+		self.assertEqual(resp.context['cl'].result_count, 0)
+
+		due = self.followup1.due_date
+		resp = self.client.get(reverse('admin:tracker_followup_changelist'), {'due_date_period': f'{due.year}-{due.month:02d}'})
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual(resp.context['cl'].result_count, 1)
+
+	def test_archive_leaves_followups_changed_while_archiving(self):
+		reopened = FollowUp.objects.create(
+			clinic=self.clinic1,
+			created_by=self.user1,
+			patient_name='Patient B',
+			phone='+15550001111',
+			due_date=date.today() + timedelta(days=4),
+		)
+		FollowUp.objects.update(status=FollowUp.Status.DONE, completed_at=timezone.now() - timedelta(days=60))
+		write_segment = archive.write_segment
+
+		def write_then_change(shard, records):
+			segment = write_segment(shard, records)
+			PublicViewLog.objects.create(followup=self.followup1)
+			followup = FollowUp.objects.get(pk=reopened.pk)
+			followup.status = FollowUp.Status.PENDING
+			followup.save()
+			return segment
+
+		with tempfile.TemporaryDirectory() as archive_dir, override_settings(ARCHIVE_DIR=archive_dir):
+			with mock.patch.object(archive, 'write_segment', write_then_change):
+				out = StringIO()
+				call_command('archive_followups', before=date.today().isoformat(), stdout=out)
+		self.assertIn('Follow-ups: 0', out.getvalue())
+		self.assertIn('Skipped (changed while archiving): 2', out.getvalue())
+		self.assertEqual(FollowUp.objects.count(), 2)
+		self.assertEqual(PublicViewLog.objects.count(), 1)
+		self.assertFalse(ArchivedFollowUp.objects.exists())
+
+	def test_archive_moves_done_followups_and_keeps_public_link(self):
+		PublicViewLog.objects.create(followup=self.followup1)
+		FollowUp.objects.filter(pk=self.followup1.pk).update(
+			status=FollowUp.Status.DONE,
+			completed_at=timezone.now() - timedelta(days=60),
+		)
+
+		with tempfile.TemporaryDirectory() as archive_dir, override_settings(ARCHIVE_DIR=archive_dir):
+			out = StringIO()
+			call_command('archive_followups', before=date.today().isoformat(), stdout=out)
+			self.assertIn('Follow-ups: 1', out.getvalue())
+			self.assertFalse(FollowUp.objects.filter(pk=self.followup1.pk).exists())
+			self.assertEqual(PublicViewLog.objects.count(), 0)
+			self.assertTrue(ArchivedFollowUp.objects.filter(public_token=self.followup1.public_token).exists())
+
+			resp = self.client.get(reverse('public_followup', kwargs={'public_token': self.followup1.public_token}))
+			self.assertEqual(resp.status_code, 200)
+			self.assertContains(resp, self.followup1.patient_name)
+			self.assertEqual(PublicViewLog.objects.count(), 0)
+
+	def test_analytics_incremental_rows_match_recompute(self):
+		self.client.login(username='u1', password='pass12345')
+		self.client.post(reverse('followup_mark_done', kwargs={'pk': self.followup1.pk}))
+		new_due = date.today() + timedelta(days=10)
+		self.client.post(
+			reverse('followups_bulk_update'),
+			{'ids': [self.followup1.pk], 'action': 'reschedule', 'due_date': new_due.isoformat()},
+		)
+		self.client.get(reverse('public_followup', kwargs={'public_token': self.followup1.public_token}))
+		self.assertEqual(analytics.catch_up_views(now=timezone.now() + timedelta(minutes=5)), 1)
+
+		stats = ClinicDailyStats.objects.filter(clinic=self.clinic1)
+		self.assertEqual(stats.get(day=timezone.localdate()).completed, 1)
+		self.assertEqual(stats.get(day=new_due).due, 1)
+		self.assertFalse(stats.filter(day=date.today() + timedelta(days=3), due__gt=0).exists())
+
+		out = StringIO()
+		call_command('rebuild_analytics', check=True, stdout=out)
+		self.assertIn('Mismatched: 0', out.getvalue())
+
+		resp = self.client.get(reverse('clinic_analytics'), {'format': 'json', 'weeks': 1})
+		week = resp.json()['weeks'][0]
+		self.assertEqual((week['created'], week['completed'], week['views']), (1, 1, 1))
+
+	def test_weekly_completion_rate_is_done_share_of_due(self):
+		week_start = timezone.localdate() - timedelta(days=timezone.localdate().weekday())
+
+		def create(due_date, status=FollowUp.Status.PENDING):
+			return FollowUp.objects.create(
+				clinic=self.clinic2, created_by=self.user2, patient_name='Patient', phone='+15550001111',
+				due_date=due_date, status=status,
+			)
+
+		# Clearing a backlog due weeks ago must not count towards this week's rate.
+		for followup in [create(week_start - timedelta(weeks=2)) for _ in range(3)]:
+			followup.status = FollowUp.Status.DONE
+			followup.save()
+		create(week_start)
+		create(week_start, FollowUp.Status.DONE)
+
+		self.client.login(username='u2', password='pass12345')
+		week = self.client.get(reverse('clinic_analytics'), {'format': 'json', 'weeks': 1}).json()['weeks'][0]
+		self.assertEqual((week['due'], week['due_completed'], week['completed']), (2, 1, 4))
+		self.assertEqual(week['completion_rate'], 0.5)
+		out = StringIO()
+		call_command('rebuild_analytics', check=True, stdout=out)
+		self.assertIn('Mismatched: 0', out.getvalue())
+
+	def test_change_feed_pages_by_cursor_and_reports_deletions(self):
+		followup2 = FollowUp.objects.create(
+			clinic=self.clinic1,
+			created_by=self.user1,
+			patient_name='Patient B',
+			phone='+15550001111',
+			due_date=date.today() + timedelta(days=4),
+		)
+		FollowUp.objects.update(updated_at=timezone.now() - timedelta(minutes=1))
+		self.client.login(username='u1', password='pass12345')
+		url = reverse('followups_changes')
+
+		page = self.client.get(url, {'limit': 1}).json()
+		self.assertEqual([c['id'] for c in page['changes']], [self.followup1.pk])
+		self.assertTrue(page['has_more'])
+		page = self.client.get(url, {'limit': 1, 'cursor': page['cursor']}).json()
+		self.assertEqual([c['id'] for c in page['changes']], [followup2.pk])
+		cursor = page['cursor']
+		self.assertEqual(self.client.get(url, {'cursor': cursor}).json()['changes'], [])
+
+		deleted_pk = followup2.pk
+		followup2.delete()
+		with connection.cursor() as db_cursor:
+			db_cursor.execute(f'SELECT COUNT(*) FROM {search.FTS_TABLE} WHERE rowid = %s', [deleted_pk])
+			self.assertEqual(db_cursor.fetchone()[0], 0)
+		FollowUpTombstone.objects.update(removed_at=timezone.now() - timedelta(seconds=30))
+		page = self.client.get(url, {'cursor': cursor}).json()
+		self.assertEqual(page['changes'][0]['id'], deleted_pk)
+		self.assertEqual(page['changes'][0]['removed'], 'deleted')
+		self.assertEqual(self.client.get(url, {'cursor': 'garbage'}).status_code, 400)
+
+	def test_warm_up_compiles_templates_and_resolves_urls(self):
+		report = warmup.warm_up()
+		self.assertEqual(report.failed, [])
+		self.assertIn('tracker/dashboard.html', warmup._project_templates())
+		self.assertGreater(report.templates, 0)
+		self.assertGreater(report.urls, 0)
+		self.assertEqual(report.databases, len(connections.all()))
+
+	@override_settings(WARMUP_ON_STARTUP=True)
+	def test_prepare_closes_warm_up_connections(self):
+		# A connection left open here would be inherited by every forked worker.
+		with mock.patch.object(warmup.connections, 'close_all') as close_all:
+			warmup.prepare(lambda environ, start_response: [], started=time.perf_counter())
+		close_all.assert_called_once_with()
+
+	def test_edit_writes_changed_columns_and_rejects_stale_version(self):
+		self.client.login(username='u1', password='pass12345')
+		url = reverse('followup_edit', kwargs={'pk': self.followup1.pk})
+		data = {
+			'patient_name': 'Patient A',
+			'phone': '+15551234567',
+			'language': FollowUp.Language.EN,
+			'notes': 'Test',
+			'due_date': self.followup1.due_date.isoformat(),
+			'status': FollowUp.Status.DONE,
+			'version': 1,
+		}
+		with CaptureQueriesContext(connection) as queries:
+			resp = self.client.post(url, data)
+		self.assertEqual(resp.status_code, 302)
+		updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE "tracker_followup"')]
+		self.assertEqual(len(updates), 1)
+		self.assertIn('"status"', updates[0])
+		self.assertNotIn('"notes"', updates[0])
+
+		resp = self.client.post(url, {**data, 'notes': 'Overwritten', 'version': 1})
+		self.assertEqual(resp.status_code, 409)
+		self.followup1.refresh_from_db()
+		self.assertEqual((self.followup1.notes, self.followup1.version), ('Test', 2))
+
+	def test_analytics_stay_consistent_after_delete(self):
+		PublicViewLog.objects.create(followup=self.followup1)
+		analytics.catch_up_views(now=timezone.now() + timedelta(minutes=5))
+		other = FollowUp.objects.create(
+			clinic=self.clinic1,
+			created_by=self.user1,
+			patient_name='Patient B',
+			phone='+15550001111',
+			due_date=date.today() + timedelta(days=4),
+			status=FollowUp.Status.DONE,
+		)
+		self.followup1.delete()
+
+		get_user_model().objects.create_superuser(username='admin', password='pass12345', email='admin@example.com')
+		self.client.login(username='admin', password='pass12345')
+		self.client.post(
+			reverse('admin:tracker_followup_changelist'),
+			{'action': 'delete_selected', '_selected_action': [other.pk], 'post': 'yes'},
+		)
+		self.assertFalse(FollowUp.objects.exists())
+
+		out = StringIO()
+		call_command('rebuild_analytics', check=True, stdout=out)
+		self.assertIn('Mismatched: 0', out.getvalue())
@@ -1,11 +1,19 @@
+from django.conf import settings
 from django.urls import path
 
 from . import views
 
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
-    path('followups/export/', views.followups_export_csv, name='followups_export_csv'),
+    path(
+        'followups/export/',
+        views.afollowups_export_csv if settings.ASYNC_VIEWS else views.followups_export_csv,
+        name='followups_export_csv',
+    ),
+    path('followups/changes/', views.followups_changes, name='followups_changes'),
     path('followups/new/', views.followup_create, name='followup_create'),
+    path('followups/bulk/', views.followups_bulk_update, name='followups_bulk_update'),
     path('followups/<int:pk>/edit/', views.followup_edit, name='followup_edit'),
     path('followups/<int:pk>/done/', views.followup_mark_done, name='followup_mark_done'),
+    path('analytics/', views.clinic_analytics, name='clinic_analytics'),
 ]
@@ -1,26 +1,44 @@
 from __future__ import annotations
 
+import asyncio
+import base64
 import csv
+import logging
 from dataclasses import dataclass
-from datetime import date
+from datetime import date, datetime, timedelta
 
+from asgiref.sync import sync_to_async
 from django.core.paginator import Paginator
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count, Q
-from django.http import Http404, HttpRequest, HttpResponse
+from django.contrib.auth.views import redirect_to_login
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Q, QuerySet, Value, When
+from django.http import Http404, HttpRequest, HttpResponse, JsonResponse, QueryDict, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.utils import timezone
 from django.views.decorators.http import require_POST
 
+from . import analytics, archive, search
 from .forms import FollowUpForm
-from .models import FollowUp, PublicViewLog, UserProfile
+from .models import (
+	ClinicDailyStats,
+	FollowUp,
+	FollowUpConflictError,
+	FollowUpDirectory,
+	FollowUpTombstone,
+	PublicViewLog,
+	UserProfile,
+)
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass(frozen=True)
 class ClinicContext:
 	clinic_id: int
+	db_alias: str
 
 
 def _get_user_clinic_context(request: HttpRequest) -> ClinicContext:
@@ -28,7 +46,7 @@ def _get_user_clinic_context(request: HttpRequest) -> ClinicContext:
 		profile: UserProfile = request.user.userprofile  # type: ignore[attr-defined]
 	except Exception as exc:
 		raise Http404('User profile/clinic not configured') from exc
-	return ClinicContext(clinic_id=profile.clinic_id)
+	return ClinicContext(clinic_id=profile.clinic_id, db_alias=profile.clinic.shard)
 
 
 def _client_ip(request: HttpRequest) -> str:
@@ -38,24 +56,24 @@ def _client_ip(request: HttpRequest) -> str:
 	return (request.META.get('REMOTE_ADDR') or '')[:64]
 
 
-@login_required
-def dashboard(request: HttpRequest) -> HttpResponse:
-	clinic_ctx = _get_user_clinic_context(request)
+def _overdue_q() -> Q:
+	# Same rule as FollowUp.is_overdue, evaluated in SQL; served by followup_clinic_status_due_idx.
+	return Q(status=FollowUp.Status.PENDING, due_date__lt=timezone.localdate())
 
-	base_qs = (
-		FollowUp.objects.filter(clinic_id=clinic_ctx.clinic_id)
-		.select_related('clinic', 'created_by')
-		.annotate(view_count=Count('public_view_logs', distinct=True))
-		.order_by('due_date', '-created_at')
-	)
 
-	status = (request.GET.get('status') or '').strip()
-	due_start = (request.GET.get('due_start') or '').strip()
-	due_end = (request.GET.get('due_end') or '').strip()
+def _apply_followup_filters(
+	qs: QuerySet, params: QueryDict, clinic_ctx: ClinicContext
+) -> tuple[QuerySet, dict[str, str]]:
+	"""Apply the dashboard/export filters (query string or bulk form) to a follow-up queryset."""
+	status = (params.get('status') or '').strip()
+	due_start = (params.get('due_start') or '').strip()
+	due_end = (params.get('due_end') or '').strip()
+	overdue = (params.get('overdue') or '').strip()
+	sort = (params.get('sort') or '').strip()
+	q = (params.get('q') or '').strip()[:100]
 
-	filtered_qs = base_qs
 	if status in {FollowUp.Status.PENDING, FollowUp.Status.DONE}:
-		filtered_qs = filtered_qs.filter(status=status)
+		qs = qs.filter(status=status)
 
 	date_filters = Q()
 	if due_start:
@@ -69,13 +87,40 @@ def dashboard(request: HttpRequest) -> HttpResponse:
 		except ValueError:
 			pass
 	if date_filters:
-		filtered_qs = filtered_qs.filter(date_filters)
+		qs = qs.filter(date_filters)
+
+	if q:
+		qs = search.search_followups(qs, clinic_ctx.clinic_id, q)
+
+	if overdue == '1':
+		qs = qs.filter(_overdue_q())
+
+	if sort == 'overdue':
+		overdue_first = Case(When(_overdue_q(), then=Value(0)), default=Value(1), output_field=IntegerField())
+		qs = qs.order_by(overdue_first, 'due_date', '-created_at')
+
+	return qs, {'status': status, 'due_start': due_start, 'due_end': due_end, 'overdue': overdue, 'sort': sort, 'q': q}
+
+
+@login_required
+def dashboard(request: HttpRequest) -> HttpResponse:
+	clinic_ctx = _get_user_clinic_context(request)
 
-	summary_qs = FollowUp.objects.filter(clinic_id=clinic_ctx.clinic_id)
+	base_qs = (
+		FollowUp.objects.using(clinic_ctx.db_alias)
+		.filter(clinic_id=clinic_ctx.clinic_id)
+		.annotate(view_count=Count('public_view_logs', distinct=True))
+		.order_by('due_date', '-created_at')
+	)
+
+	filtered_qs, filters = _apply_followup_filters(base_qs, request.GET, clinic_ctx)
+
+	summary_qs = FollowUp.objects.using(clinic_ctx.db_alias).filter(clinic_id=clinic_ctx.clinic_id)
 	summary = {
 		'total': summary_qs.count(),
 		'pending': summary_qs.filter(status=FollowUp.Status.PENDING).count(),
 		'done': summary_qs.filter(status=FollowUp.Status.DONE).count(),
+		'overdue': summary_qs.filter(_overdue_q()).count(),
 	}
 
 	try:
@@ -99,83 +144,175 @@ def dashboard(request: HttpRequest) -> HttpResponse:
 			'page_obj': page_obj,
 			'qs_no_page': qs_no_page_str,
 			'summary': summary,
-			'filters': {'status': status, 'due_start': due_start, 'due_end': due_end},
+			'filters': filters,
 		},
 	)
 
 
-@login_required
-def followups_export_csv(request: HttpRequest) -> HttpResponse:
-	clinic_ctx = _get_user_clinic_context(request)
+_EXPORT_HEADER = [
+	'patient_name',
+	'phone',
+	'language',
+	'due_date',
+	'status',
+	'notes',
+	'public_token',
+	'view_count',
+	'created_at',
+	'updated_at',
+]
 
+
+def _export_queryset(request: HttpRequest, clinic_ctx: ClinicContext) -> QuerySet:
 	base_qs = (
-		FollowUp.objects.filter(clinic_id=clinic_ctx.clinic_id)
+		FollowUp.objects.using(clinic_ctx.db_alias)
+		.filter(clinic_id=clinic_ctx.clinic_id)
 		.annotate(view_count=Count('public_view_logs', distinct=True))
 		.order_by('due_date', '-created_at')
 	)
+	filtered_qs, _ = _apply_followup_filters(base_qs, request.GET, clinic_ctx)
+	return filtered_qs
 
-	status = (request.GET.get('status') or '').strip()
-	due_start = (request.GET.get('due_start') or '').strip()
-	due_end = (request.GET.get('due_end') or '').strip()
 
-	filtered_qs = base_qs
-	if status in {FollowUp.Status.PENDING, FollowUp.Status.DONE}:
-		filtered_qs = filtered_qs.filter(status=status)
+def _export_filename() -> str:
+	timestamp = timezone.localtime().strftime('%Y%m%d-%H%M%S')
+	return f'followups-{timestamp}.csv'
 
-	date_filters = Q()
-	if due_start:
-		try:
-			date_filters &= Q(due_date__gte=date.fromisoformat(due_start))
-		except ValueError:
-			pass
-	if due_end:
-		try:
-			date_filters &= Q(due_date__lte=date.fromisoformat(due_end))
-		except ValueError:
-			pass
-	if date_filters:
-		filtered_qs = filtered_qs.filter(date_filters)
 
-	timestamp = timezone.localtime().strftime('%Y%m%d-%H%M%S')
-	filename = f'followups-{timestamp}.csv'
+def _export_row(followup: FollowUp) -> list:
+	return [
+		followup.patient_name,
+		followup.phone,
+		followup.language,
+		followup.due_date.isoformat(),
+		followup.status,
+		followup.notes,
+		followup.public_token,
+		getattr(followup, 'view_count', 0),
+		followup.created_at.isoformat() if followup.created_at else '',
+		followup.updated_at.isoformat() if followup.updated_at else '',
+	]
+
+
+@login_required
+def followups_export_csv(request: HttpRequest) -> HttpResponse:
+	clinic_ctx = _get_user_clinic_context(request)
+	filtered_qs = _export_queryset(request, clinic_ctx)
 
 	response = HttpResponse(content_type='text/csv; charset=utf-8')
-	response['Content-Disposition'] = f'attachment; filename="{filename}"'
+	response['Content-Disposition'] = f'attachment; filename="{_export_filename()}"'
 
 	writer = csv.writer(response)
-	writer.writerow(
-		[
-			'patient_name',
-			'phone',
-			'language',
-			'due_date',
-			'status',
-			'notes',
-			'public_token',
-			'view_count',
-			'created_at',
-			'updated_at',
-		]
-	)
+	writer.writerow(_EXPORT_HEADER)
 	for followup in filtered_qs:
-		writer.writerow(
-			[
-				followup.patient_name,
-				followup.phone,
-				followup.language,
-				followup.due_date.isoformat(),
-				followup.status,
-				followup.notes,
-				followup.public_token,
-				getattr(followup, 'view_count', 0),
-				followup.created_at.isoformat() if followup.created_at else '',
-				followup.updated_at.isoformat() if followup.updated_at else '',
-			]
-		)
+		writer.writerow(_export_row(followup))
 
 	return response
 
 
+# Rows changed this recently are left for the next poll, so a write whose
+# transaction commits up to this long after it stamped updated_at is still
+# seen. Only that much: a commit later than this, behind a cursor that has
+# already passed its updated_at, is never reported. Writes therefore stamp
+# updated_at as late as they can (save() in its UPDATE, the bulk update after
+# taking its locks).
+_CHANGES_SETTLE_DELAY = timedelta(seconds=5)
+_CHANGES_DEFAULT_LIMIT = 100
+_CHANGES_MAX_LIMIT = 500
+
+
+def _encode_cursor(changed_at, pk: int) -> str:
+	raw = f'{changed_at.isoformat()}|{pk}'.encode()
+	return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _decode_cursor(cursor: str):
+	try:
+		raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+		changed_at, pk = raw.split('|')
+		changed_at = datetime.fromisoformat(changed_at)
+		if timezone.is_naive(changed_at):
+			raise ValueError
+		return changed_at, int(pk)
+	except ValueError:
+		return None
+
+
+def _after_cursor(field: str, cursor) -> Q:
+	if cursor is None:
+		return Q()
+	changed_at, pk = cursor
+	return Q(**{f'{field}__gt': changed_at}) | Q(**{field: changed_at, 'id__gt': pk})
+
+
+@login_required
+def followups_changes(request: HttpRequest) -> HttpResponse:
+	"""Clinic-scoped change feed: follow-ups changed, and removed, after ``cursor``.
+
+	Entries come in ``(changed_at, id)`` order, at most ``limit`` per page; pass
+	the returned ``cursor`` back until ``has_more`` is false. Removed follow-ups
+	(deleted or archived) appear as ``{"id", "removed": reason}`` tombstones.
+	"""
+	clinic_ctx = _get_user_clinic_context(request)
+	cursor = None
+	if request.GET.get('cursor'):
+		cursor = _decode_cursor(request.GET['cursor'])
+		if cursor is None:
+			return JsonResponse({'error': 'Invalid cursor.'}, status=400)
+	try:
+		limit = min(max(int(request.GET.get('limit') or _CHANGES_DEFAULT_LIMIT), 1), _CHANGES_MAX_LIMIT)
+	except ValueError:
+		limit = _CHANGES_DEFAULT_LIMIT
+	until = timezone.now() - _CHANGES_SETTLE_DELAY
+
+	# Each source reads at most limit + 1 rows off its (clinic, changed_at, id) index.
+	followups = (
+		FollowUp.objects.using(clinic_ctx.db_alias)
+		.filter(_after_cursor('updated_at', cursor), clinic_id=clinic_ctx.clinic_id, updated_at__lt=until)
+		.order_by('updated_at', 'id')[: limit + 1]
+	)
+	tombstones = (
+		FollowUpTombstone.objects.filter(
+			_after_cursor('removed_at', cursor), clinic_id=clinic_ctx.clinic_id, removed_at__lt=until
+		)
+		.order_by('removed_at', 'id')[: limit + 1]
+	)
+	entries = sorted(
+		[(f.updated_at, f.pk, f) for f in followups] + [(t.removed_at, t.pk, t) for t in tombstones],
+		key=lambda entry: entry[:2],
+	)
+	has_more = len(entries) > limit
+	entries = entries[:limit]
+
+	changes = []
+	for changed_at, pk, row in entries:
+		if isinstance(row, FollowUpTombstone):
+			changes.append({'id': pk, 'removed': row.reason, 'changed_at': changed_at.isoformat()})
+			continue
+		changes.append(
+			{
+				'id': pk,
+				'public_token': row.public_token,
+				'patient_name': row.patient_name,
+				'phone': row.phone,
+				'language': row.language,
+				'due_date': row.due_date.isoformat(),
+				'status': row.status,
+				'notes': row.notes,
+				'created_at': row.created_at.isoformat(),
+				'completed_at': row.completed_at.isoformat() if row.completed_at else None,
+				'removed': None,
+				'changed_at': changed_at.isoformat(),
+			}
+		)
+
+	if entries:
+		next_cursor = _encode_cursor(entries[-1][0], entries[-1][1])
+	else:
+		next_cursor = request.GET.get('cursor') or ''
+	return JsonResponse({'changes': changes, 'cursor': next_cursor, 'has_more': has_more})
+
+
 @login_required
 def followup_create(request: HttpRequest) -> HttpResponse:
 	clinic_ctx = _get_user_clinic_context(request)
@@ -185,7 +322,7 @@ def followup_create(request: HttpRequest) -> HttpResponse:
 			followup: FollowUp = form.save(commit=False)
 			followup.clinic_id = clinic_ctx.clinic_id
 			followup.created_by = request.user
-			followup.save()
+			followup.save(using=clinic_ctx.db_alias)
 			messages.success(request, 'Follow-up created.')
 			return redirect('dashboard')
 	else:
@@ -197,57 +334,271 @@ def followup_create(request: HttpRequest) -> HttpResponse:
 @login_required
 def followup_edit(request: HttpRequest, pk: int) -> HttpResponse:
 	clinic_ctx = _get_user_clinic_context(request)
-	followup = get_object_or_404(FollowUp, pk=pk, clinic_id=clinic_ctx.clinic_id)
+	followup = get_object_or_404(FollowUp.objects.using(clinic_ctx.db_alias), pk=pk, clinic_id=clinic_ctx.clinic_id)
 
+	status = 200
 	if request.method == 'POST':
 		form = FollowUpForm(request.POST, instance=followup)
 		if form.is_valid():
-			form.save()
-			messages.success(request, 'Follow-up updated.')
-			return redirect('dashboard')
+			try:
+				form.save()
+			except FollowUpConflictError:
+				form.add_error(
+					None,
+					'Someone else changed this follow-up while you were editing it. '
+					'Reload the page to see their changes, then edit again.',
+				)
+				status = 409
+			else:
+				messages.success(request, 'Follow-up updated.')
+				return redirect('dashboard')
 	else:
 		form = FollowUpForm(instance=followup)
 
-	return render(request, 'tracker/followup_form.html', {'form': form, 'mode': 'edit', 'followup': followup})
+	return render(
+		request, 'tracker/followup_form.html', {'form': form, 'mode': 'edit', 'followup': followup}, status=status
+	)
 
 
 @login_required
 @require_POST
 def followup_mark_done(request: HttpRequest, pk: int) -> HttpResponse:
 	clinic_ctx = _get_user_clinic_context(request)
-	followup = get_object_or_404(FollowUp, pk=pk, clinic_id=clinic_ctx.clinic_id)
+	followup = get_object_or_404(FollowUp.objects.using(clinic_ctx.db_alias), pk=pk, clinic_id=clinic_ctx.clinic_id)
 	followup.status = FollowUp.Status.DONE
-	followup.save(update_fields=['status', 'updated_at'])
-	messages.success(request, 'Marked as done.')
+	try:
+		followup.save(update_fields=['status', 'updated_at'])
+	except FollowUpConflictError:
+		messages.error(request, 'Someone else changed this follow-up just now. Please try again.')
+	else:
+		messages.success(request, 'Marked as done.')
 	return redirect('dashboard')
 
 
+def _bulk_response(request: HttpRequest, *, updated: int = 0, error: str = '') -> HttpResponse:
+	if 'application/json' in (request.headers.get('Accept') or ''):
+		if error:
+			return JsonResponse({'error': error}, status=400)
+		return JsonResponse({'updated': updated})
+	if error:
+		messages.error(request, error)
+	else:
+		messages.success(request, f'Updated {updated} follow-up(s).')
+	return_qs = (request.POST.get('return_qs') or '').strip()
+	return redirect(reverse('dashboard') + (f'?{return_qs}' if return_qs else ''))
+
+
+@login_required
+@require_POST
+def followups_bulk_update(request: HttpRequest) -> HttpResponse:
+	"""Apply one action to many follow-ups with a single clinic-scoped UPDATE.
+
+	Targets the posted ``ids``, or with ``scope=filter`` every follow-up matching
+	the posted dashboard filters. Answers JSON when the client accepts it.
+
+	The affected rows' dates are read first, under lock, so the analytics
+	counters move by the same change.
+	"""
+	clinic_ctx = _get_user_clinic_context(request)
+	qs = FollowUp.objects.using(clinic_ctx.db_alias).filter(clinic_id=clinic_ctx.clinic_id)
+
+	if request.POST.get('scope') == 'filter':
+		qs, _ = _apply_followup_filters(qs, request.POST, clinic_ctx)
+	else:
+		ids = [int(value) for value in request.POST.getlist('ids') if value.isdigit()]
+		if not ids:
+			return _bulk_response(request, error='No follow-ups selected.')
+		qs = qs.filter(pk__in=ids)
+
+	now = timezone.now()
+	action = request.POST.get('action')
+	if action == 'done':
+		qs, values = qs.exclude(status=FollowUp.Status.DONE), {'status': FollowUp.Status.DONE, 'completed_at': now}
+	elif action == 'reopen':
+		qs, values = qs.exclude(status=FollowUp.Status.PENDING), {'status': FollowUp.Status.PENDING, 'completed_at': None}
+	elif action == 'reschedule':
+		try:
+			due_date = date.fromisoformat((request.POST.get('due_date') or '').strip())
+		except ValueError:
+			return _bulk_response(request, error='Enter a valid due date.')
+		if due_date < timezone.localdate():
+			return _bulk_response(request, error='Due date cannot be in the past.')
+		qs, values = qs.exclude(due_date=due_date), {'due_date': due_date}
+	else:
+		return _bulk_response(request, error='Unknown bulk action.')
+
+	qs = qs.order_by()
+	with transaction.atomic(using=clinic_ctx.db_alias):
+		before = list(qs.select_for_update().values_list('created_at', 'due_date', 'completed_at'))
+		# QuerySet.update() skips auto_now, so set updated_at explicitly. It is
+		# taken after the locks are held, to stay close to the commit (see
+		# _CHANGES_SETTLE_DELAY).
+		updated = qs.update(**values, updated_at=timezone.now(), version=F('version') + 1)
+		analytics.record_bulk_change(clinic_ctx.clinic_id, before, values)
+	return _bulk_response(request, updated=updated)
+
+
+def _weekly_analytics(clinic_id: int, weeks: int) -> list[dict]:
+	"""Roll the clinic's daily stats rows up into Monday-based weeks, oldest first."""
+	today = timezone.localdate()
+	first_week = today - timedelta(days=today.weekday(), weeks=weeks - 1)
+	totals = {
+		first_week + timedelta(weeks=i): dict.fromkeys(analytics.COUNTERS, 0) for i in range(weeks)
+	}
+	rows = ClinicDailyStats.objects.filter(
+		clinic_id=clinic_id, day__gte=first_week, day__lt=first_week + timedelta(weeks=weeks)
+	).values_list('day', *analytics.COUNTERS)
+	for day, *counters in rows:
+		week = totals[day - timedelta(days=day.weekday())]
+		for name, value in zip(analytics.COUNTERS, counters):
+			week[name] += value
+
+	result = []
+	for week_start, week in totals.items():
+		result.append(
+			{
+				'week_start': week_start.isoformat(),
+				'created': week['created'],
+				'due': week['due'],
+				'due_completed': week['due_completed'],
+				'completed': week['completed'],
+				# Share of the follow-ups due in the week that are done by now.
+				'completion_rate': round(week['due_completed'] / week['due'], 3) if week['due'] else None,
+				'avg_days_to_done': (
+					round(week['completion_seconds'] / week['completed'] / 86400, 1) if week['completed'] else None
+				),
+				'views': week['views'],
+			}
+		)
+	return result
+
+
+@login_required
+def clinic_analytics(request: HttpRequest) -> HttpResponse:
+	"""Weekly completion, time-to-done, engagement and due load, from ClinicDailyStats only."""
+	clinic_ctx = _get_user_clinic_context(request)
+	try:
+		weeks = min(max(int(request.GET.get('weeks') or '12'), 1), 52)
+	except ValueError:
+		weeks = 12
+
+	rows = _weekly_analytics(clinic_ctx.clinic_id, weeks)
+	if request.GET.get('format') == 'json':
+		return JsonResponse({'weeks': rows})
+	return render(request, 'tracker/analytics.html', {'rows': rows, 'weeks': weeks})
+
+
+_PUBLIC_INSTRUCTIONS = {
+	FollowUp.Language.EN: [
+		'Please follow the instructions from your clinic.',
+		'If you have questions, contact the clinic using the phone number you already have.',
+	],
+	FollowUp.Language.HI: [
+		'कृपया अपने क्लिनिक के निर्देशों का पालन करें।',
+		'यदि कोई सवाल हो, तो क्लिनिक से संपर्क करें।',
+	],
+}
+
+
+def _public_context(request: HttpRequest, followup: FollowUp) -> dict:
+	public_url = request.build_absolute_uri(reverse('public_followup', kwargs={'public_token': followup.public_token}))
+	return {
+		'followup': followup,
+		'public_url': public_url,
+		'instructions': _PUBLIC_INSTRUCTIONS.get(followup.language, _PUBLIC_INSTRUCTIONS[FollowUp.Language.EN]),
+	}
+
+
 def public_followup(request: HttpRequest, public_token: str) -> HttpResponse:
-	followup = get_object_or_404(FollowUp, public_token=public_token)
-	PublicViewLog.objects.create(
+	entry = get_object_or_404(FollowUpDirectory.objects.select_related('clinic'), public_token=public_token)
+	followup = FollowUp.objects.using(entry.clinic.shard).filter(pk=entry.pk).first()
+	if followup is None:
+		# Archived follow-ups are read from cold storage; those visits are not logged.
+		followup = archive.load_archived_followup(pk=entry.pk)
+		if followup is None:
+			raise Http404('Follow-up not found')
+		return render(request, 'tracker/public_followup.html', _public_context(request, followup))
+
+	PublicViewLog.objects.using(entry.clinic.shard).create(
 		followup=followup,
 		user_agent=(request.META.get('HTTP_USER_AGENT') or '')[:255],
 		ip_address=_client_ip(request),
 	)
+	return render(request, 'tracker/public_followup.html', _public_context(request, followup))
 
-	instructions = {
-		FollowUp.Language.EN: [
-			'Please follow the instructions from your clinic.',
-			'If you have questions, contact the clinic using the phone number you already have.',
-		],
-		FollowUp.Language.HI: [
-			'कृपया अपने क्लिनिक के निर्देशों का पालन करें।',
-			'यदि कोई सवाल हो, तो क्लिनिक से संपर्क करें।',
-		],
-	}
 
-	public_url = request.build_absolute_uri(reverse('public_followup', kwargs={'public_token': followup.public_token}))
-	return render(
-		request,
-		'tracker/public_followup.html',
-		{
-			'followup': followup,
-			'public_url': public_url,
-			'instructions': instructions.get(followup.language, instructions[FollowUp.Language.EN]),
-		},
-	)
+# Native async variants, routed instead of the sync views above when
+# ASYNC_VIEWS is on (serving through cftlite.asgi). Under WSGI every async
+# view would get its own event loop, so the sync views remain the default.
+
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _fire_and_forget(coro) -> None:
+	task = asyncio.create_task(coro)
+	_background_tasks.add(task)
+	task.add_done_callback(_finish_background_task)
+
+
+def _finish_background_task(task: asyncio.Task) -> None:
+	_background_tasks.discard(task)
+	if not task.cancelled() and task.exception() is not None:
+		logger.error('Background task failed', exc_info=task.exception())
+
+
+async def _aget_user_clinic_context(request: HttpRequest) -> ClinicContext | None:
+	user = await request.auser()
+	if not user.is_authenticated:
+		return None
+	profile = await UserProfile.objects.select_related('clinic').filter(user_id=user.pk).afirst()
+	if profile is None:
+		raise Http404('User profile/clinic not configured')
+	return ClinicContext(clinic_id=profile.clinic_id, db_alias=profile.clinic.shard)
+
+
+async def apublic_followup(request: HttpRequest, public_token: str) -> HttpResponse:
+	entry = await FollowUpDirectory.objects.select_related('clinic').filter(public_token=public_token).afirst()
+	if entry is None:
+		raise Http404('Follow-up not found')
+	followup = await FollowUp.objects.using(entry.clinic.shard).filter(pk=entry.pk).afirst()
+	if followup is None:
+		followup = await sync_to_async(archive.load_archived_followup)(pk=entry.pk)
+		if followup is None:
+			raise Http404('Follow-up not found')
+	else:
+		_fire_and_forget(
+			PublicViewLog.objects.using(entry.clinic.shard).acreate(
+				followup=followup,
+				user_agent=(request.META.get('HTTP_USER_AGENT') or '')[:255],
+				ip_address=_client_ip(request),
+			)
+		)
+
+	context = _public_context(request, followup)
+	# Resolve the user up front and leave staff flash messages queued: the lazy
+	# context-processor values would otherwise hit the session synchronously.
+	context['user'] = await request.auser()
+	context['messages'] = ()
+	return render(request, 'tracker/public_followup.html', context)
+
+
+class _Echo:
+	def write(self, value: str) -> str:
+		return value
+
+
+async def afollowups_export_csv(request: HttpRequest) -> HttpResponse:
+	clinic_ctx = await _aget_user_clinic_context(request)
+	if clinic_ctx is None:
+		return redirect_to_login(request.get_full_path())
+	filtered_qs = _export_queryset(request, clinic_ctx)
+
+	async def rows():
+		writer = csv.writer(_Echo())
+		yield writer.writerow(_EXPORT_HEADER)
+		async for followup in filtered_qs.aiterator(chunk_size=500):
+			yield writer.writerow(_export_row(followup))
+
+	response = StreamingHttpResponse(rows(), content_type='text/csv; charset=utf-8')
+	response['Content-Disposition'] = f'attachment; filename="{_export_filename()}"'
+	return response
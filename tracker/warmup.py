@@ -0,0 +1,189 @@
+"""Worker warm-up and startup timing.
+
+``cftlite.wsgi`` and ``cftlite.asgi`` hand their application to ``prepare``,
+which runs ``warm_up`` (unless ``WARMUP_ON_STARTUP`` is off) and wraps the
+application so the first response is timed. The ``warmup`` command runs the
+same steps on demand; ``profile_startup`` measures fresh processes with and
+without them.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass, field
+from importlib import import_module
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.template import engines
+from django.urls import NoReverseMatch, get_resolver, reverse
+
+logger = logging.getLogger(__name__)
+
+# Seconds spent in each startup phase of this process, for profile_startup.
+STARTUP: dict[str, float] = {}
+
+
+@dataclass
+class WarmupReport:
+	steps: dict[str, float] = field(default_factory=dict)
+	failed: list[str] = field(default_factory=list)
+	urls: int = 0
+	templates: int = 0
+	databases: int = 0
+
+	@property
+	def total(self) -> float:
+		return sum(self.steps.values())
+
+	def summary(self) -> str:
+		parts = [f'{name} {seconds * 1000:.0f}ms' for name, seconds in self.steps.items()]
+		if self.failed:
+			parts.append(f"failed: {', '.join(self.failed)}")
+		return ', '.join(parts)
+
+
+def _run_step(report: WarmupReport, name: str, func) -> None:
+	# Warm-up only saves time later; a failing step must never stop a worker from starting.
+	started = time.perf_counter()
+	try:
+		func()
+	except Exception:
+		report.failed.append(name)
+		logger.warning('Warm-up step %s failed', name, exc_info=True)
+	report.steps[name] = time.perf_counter() - started
+
+
+def _import_views() -> None:
+	import_module(settings.ROOT_URLCONF)
+	import_module('tracker.views')
+
+
+def _reverse_all(resolver, namespace: str = '') -> int:
+	"""Reverse every URL name, with a placeholder for each argument; return how many resolved."""
+	resolved = 0
+	for name in list(resolver.reverse_dict):
+		if not isinstance(name, str):
+			continue
+		params = resolver.reverse_dict.getlist(name)[0][0][0][1]
+		try:
+			reverse(f'{namespace}{name}', kwargs={param: '1' for param in params})
+			resolved += 1
+		except NoReverseMatch:
+			pass
+	for child_namespace, (_, child) in resolver.namespace_dict.items():
+		resolved += _reverse_all(child, f'{namespace}{child_namespace}:')
+	return resolved
+
+
+def _project_templates() -> list[str]:
+	"""Names of the templates shipped with the project (not with Django or other packages)."""
+	base_dir = Path(settings.BASE_DIR).resolve()
+	names = []
+	for engine in engines.all():
+		for template_dir in engine.template_dirs:
+			template_dir = Path(template_dir).resolve()
+			if not template_dir.is_relative_to(base_dir):
+				continue
+			names.extend(path.relative_to(template_dir).as_posix() for path in sorted(template_dir.rglob('*.html')))
+	return names
+
+
+def _load_templates(report: WarmupReport) -> None:
+	for name in _project_templates():
+		# Compiles the template (and its parents) into the cached loader.
+		engines['django'].get_template(name)
+		report.templates += 1
+
+
+def _render_forms() -> None:
+	from .forms import FollowUpForm
+
+	# Loads the form renderer's widget templates as well as the form class.
+	FollowUpForm().as_p()
+
+
+def _prime_databases(report: WarmupReport) -> None:
+	# Loads each backend's driver and runs a first ORM query. Django connections
+	# are per thread, so an opened connection only ever serves this thread.
+	from .models import FollowUp
+
+	for alias in connections:
+		connections[alias].ensure_connection()
+		FollowUp.objects.using(alias).order_by().exists()
+		report.databases += 1
+
+
+def warm_up(*, databases: bool = True) -> WarmupReport:
+	"""Do the one-off work a fresh worker would otherwise do on its first requests."""
+	report = WarmupReport()
+	_run_step(report, 'views', _import_views)
+	_run_step(report, 'urls', lambda: setattr(report, 'urls', _reverse_all(get_resolver())))
+	_run_step(report, 'templates', lambda: _load_templates(report))
+	_run_step(report, 'forms', _render_forms)
+	if databases:
+		_run_step(report, 'databases', lambda: _prime_databases(report))
+	return report
+
+
+class _FirstResponseTimer:
+	def __init__(self, started: float):
+		self.started = started
+		self.pending = True
+
+	def done(self) -> None:
+		if not self.pending:
+			return
+		self.pending = False
+		STARTUP['first_response'] = time.perf_counter() - self.started
+		logger.info('First response %.0fms after startup began', STARTUP['first_response'] * 1000)
+
+
+def prepare(application, *, started: float, asgi: bool = False):
+	"""Warm up a freshly built application and wrap it to time its first response.
+
+	``started`` is ``time.perf_counter()`` taken at the top of the wsgi/asgi
+	module, so the setup time covers importing Django and the project. Under
+	ASGI the ORM runs in worker threads (and import may happen inside the
+	event loop), so databases are left to the first request.
+
+	Connections opened by the warm-up are closed again: the module may be
+	imported by a server's master process before it forks workers (gunicorn
+	``--preload``), and a socket opened there would be shared by all of them.
+	"""
+	STARTUP['setup'] = time.perf_counter() - started
+	if settings.WARMUP_ON_STARTUP:
+		report = warm_up(databases=not asgi)
+		connections.close_all()
+		STARTUP['warmup'] = report.total
+		logger.info('Warm-up: %s', report.summary())
+	logger.info(
+		'Startup: Django setup %.0fms, warm-up %.0fms',
+		STARTUP['setup'] * 1000,
+		STARTUP.get('warmup', 0) * 1000,
+	)
+
+	timer = _FirstResponseTimer(started)
+	if asgi:
+
+		async def timed_asgi(scope, receive, send):
+			if not timer.pending or scope['type'] != 'http':
+				return await application(scope, receive, send)
+
+			async def timed_send(message):
+				if message['type'] == 'http.response.start':
+					timer.done()
+				await send(message)
+
+			return await application(scope, receive, timed_send)
+
+		return timed_asgi
+
+	def timed_wsgi(environ, start_response):
+		response = application(environ, start_response)
+		timer.done()
+		return response
+
+	return timed_wsgi